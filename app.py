@@ -1,22 +1,42 @@
 import os
+import io
 import json
-import difflib
+import mmap
 import random
 import re
 import base64
+import bisect
+import functools
+import importlib.util
+import itertools
+import threading
+import hashlib
+import tempfile
+import wave
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional, Dict, Any, List, Tuple
 
 import streamlit as st
 from dotenv import load_dotenv
-from langdetect import detect, DetectorFactory
-from ml2en import ml2en
-from openai import OpenAI
-from streamlit_mic_recorder import speech_to_text
-from sarvamai import SarvamAI
-
-# For consistent language detection
-DetectorFactory.seed = 0
+from rapidfuzz import process
+from rapidfuzz.distance import JaroWinkler
+
+from utils.lang_utils import has_manglish_hint
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+try:
+    from markupsafe import escape
+except ImportError:  # pure-Python escaper
+    from html import escape
 
 # -------------------------------
 # LOAD ENVIRONMENT
@@ -25,6 +45,8 @@ load_dotenv()
 
 PPLX_API_KEY = os.getenv("PPLX_API_KEY")
 SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
+# Set to 1 to classify ASCII queries with langdetect instead of the word list
+USE_LANGDETECT = os.getenv("USE_LANGDETECT", "0") == "1"
 
 if not PPLX_API_KEY:
     st.error("⚠️ PPLX_API_KEY is missing!")
@@ -37,18 +59,101 @@ if not SARVAM_API_KEY:
 # -------------------------------
 # INITIALIZE CLIENTS
 # -------------------------------
-pplx_client = OpenAI(
-    api_key=PPLX_API_KEY,
-    base_url="https://api.perplexity.ai",
-)
+# SDKs are imported on first use and each client is built once per process
+PPLX_BASE_URL = "https://api.perplexity.ai"
+
+
+@st.cache_resource
+def get_pplx_http_client():
+    import httpx
+    # Keep idle connections long enough to outlast a user typing their first question
+    return httpx.Client(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60.0),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    )
+
+
+@st.cache_resource
+def get_pplx_client():
+    from openai import OpenAI
+    return OpenAI(
+        api_key=PPLX_API_KEY,
+        base_url=PPLX_BASE_URL,
+        http_client=get_pplx_http_client(),
+    )
+
+
+def warm_pplx_connection(http_client):
+    """Open a pooled connection to Perplexity so the first query skips the TCP/TLS handshake"""
+    try:
+        http_client.head(PPLX_BASE_URL, timeout=2.0)
+    except Exception as e:
+        print(f"Perplexity warm-up failed: {e}")
+
+
+@st.cache_resource
+def get_sarvam_client():
+    from sarvamai import SarvamAI
+    return SarvamAI(
+        api_subscription_key=SARVAM_API_KEY,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_langdetect():
+    from langdetect import detect, DetectorFactory
+    # For consistent language detection
+    DetectorFactory.seed = 0
+    return detect
+
+
+@functools.lru_cache(maxsize=None)
+def get_ml2en():
+    from ml2en import ml2en
+    # ml2en is a namespace class; transliterate is its only entry point
+    return ml2en.transliterate
+
+TTS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tts")
+TTS_MEMORY_CACHE_SIZE = 256
+# Replies are voiced in the background so the text can render first
+TTS_POOL = ThreadPoolExecutor(max_workers=4)
+# Multi-sentence replies are voiced one sentence per request, in parallel.
+# Separate from TTS_POOL, whose workers wait on these.
+TTS_SENTENCE_POOL = ThreadPoolExecutor(max_workers=3)
+# Sentence end: terminal punctuation followed by whitespace (so "4.5" is not split)
+SENTENCE_END_RE = re.compile(r"(?<=[.!?\u0964])\s+")
+# Opus in OGG is ~10x smaller than the WAV Sarvam returns; TTS_FORMAT=wav keeps WAV.
+# PyAV itself is imported on the first encode, not at startup.
+TTS_USE_OPUS = importlib.util.find_spec("av") is not None and os.getenv("TTS_FORMAT", "opus") != "wav"
+TTS_OPUS_BIT_RATE = 24000
+# Messages kept per session; audio is stored once in the shared cache, by key
+MAX_MESSAGES = 50
+
+
+def load_json_file(path: str):
+    """Parse a JSON file, using orjson over a memory map when available"""
+    if orjson is None:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return orjson.loads(view)
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_text(text: str) -> str:
+    """The one lower-case/strip normalization used for queries, patterns and tags"""
+    return text.lower().strip()
 
-sarvam_client = SarvamAI(
-    api_subscription_key=SARVAM_API_KEY,
-)
 
 # -------------------------------
 # CONVERSATION HANDLER
 # -------------------------------
+# ASCII punctuation and symbols; letters, digits, whitespace and non-ASCII text are kept
+CONVERSATION_STRIP_RE = re.compile(r"[^A-Za-z0-9\s\u0080-\U0010ffff]")
+
+
 class ConversationHandler:
     """Handle greetings, small talk, and friendly interactions"""
     
@@ -106,6 +211,31 @@ class ConversationHandler:
                         "എന്റെ പേര് സർവജ്ഞ."],
             "നീ ആരാ": ["ഞാൻ സർവജ്ഞ!", "എന്റെ പേര് സർവജ്ഞ."],
         }
+        
+        # Every (key, responses, type) in match priority order, flattened once
+        self._all_patterns = [
+            (key, responses, pattern_type)
+            for patterns, pattern_type in (
+                (self.greeting_patterns, "greeting"),
+                (self.how_are_you_patterns, "how_are_you"),
+                (self.thank_you_patterns, "thank_you"),
+                (self.goodbye_patterns, "goodbye"),
+                (self.about_me_patterns, "about_me"),
+            )
+            for key, responses in patterns.items()
+        ]
+        # Keys contained in the query are found in one automaton pass
+        self._automaton = None
+        if ahocorasick is not None:
+            first_use = {}
+            for i, (key, _, _) in enumerate(self._all_patterns):
+                first_use.setdefault(key, i)
+            self._automaton = ahocorasick.Automaton()
+            for key, i in first_use.items():
+                self._automaton.add_word(key, i)
+            self._automaton.make_automaton()
+        # Only the matched pattern is cached; the reply is still picked at random
+        self._pattern_index_cached = functools.lru_cache(maxsize=512)(self._find_pattern_index)
     
     def get_time_based_greeting(self, lang: str = "en") -> str:
         hour = datetime.now().hour
@@ -136,23 +266,45 @@ class ConversationHandler:
             return f"{time_greeting} I'm Sarvajna, the AI assistant for LBS College. Feel free to ask me anything about the college!"
     
     def is_conversation_query(self, query: str) -> Tuple[bool, str, str]:
-        query_lower = query.lower().strip()
-        query_clean = ''.join(c for c in query_lower if c.isalnum() or c.isspace() or ord(c) > 127)
-        
-        all_patterns = [
-            (self.greeting_patterns, "greeting"),
-            (self.how_are_you_patterns, "how_are_you"),
-            (self.thank_you_patterns, "thank_you"),
-            (self.goodbye_patterns, "goodbye"),
-            (self.about_me_patterns, "about_me"),
-        ]
-        
-        for patterns, pattern_type in all_patterns:
-            for key, responses in patterns.items():
-                if key in query_clean or query_clean in key:
-                    return True, random.choice(responses), pattern_type
-        
+        best = self._pattern_index_cached(CONVERSATION_STRIP_RE.sub("", normalize_text(query)))
+        if best < len(self._all_patterns):
+            _, responses, pattern_type = self._all_patterns[best]
+            return True, random.choice(responses), pattern_type
         return False, "", ""
+    
+    def _find_pattern_index(self, query_clean: str) -> int:
+        """Earliest pattern whose key is in the query, or that contains the query; len(self._all_patterns) if none"""
+        if self._automaton is not None:
+            best = min((i for _, i in self._automaton.iter(query_clean)), default=len(self._all_patterns))
+            for i in range(best):
+                if query_clean in self._all_patterns[i][0]:
+                    best = i
+                    break
+        else:
+            best = next(
+                (i for i, (key, _, _) in enumerate(self._all_patterns)
+                 if key in query_clean or query_clean in key),
+                len(self._all_patterns),
+            )
+        return best
+
+
+def build_keyword_automaton(keyword_groups: Dict[str, List[str]]):
+    """
+    Aho-Corasick automaton over every keyword in keyword_groups, each mapped to
+    the indices of the groups that list it. None without pyahocorasick.
+    """
+    if ahocorasick is None:
+        return None
+    owners = {}
+    for i, keywords in enumerate(keyword_groups.values()):
+        for keyword in keywords:
+            owners.setdefault(keyword, []).append(i)
+    automaton = ahocorasick.Automaton()
+    for keyword, group_idxs in owners.items():
+        automaton.add_word(keyword, tuple(group_idxs))
+    automaton.make_automaton()
+    return automaton
 
 
 # -------------------------------
@@ -164,6 +316,16 @@ class KnowledgeBase:
     def __init__(self, file_name: str = "faq_data.json"):
         self.file_path = file_name
         self.faqs = []
+        self._patterns = []
+        self._pattern_owner = []
+        self._automaton = None
+        self._empty_pattern_idx = 0
+        self._by_len = []
+        self._pattern_lengths = []
+        self._tags = []
+        self._tag_owner = []
+        # Normalized query -> entry index; users repeat the same few questions
+        self._entry_index_cached = functools.lru_cache(maxsize=512)(self._find_entry_index)
         self.load_faqs()
         
         # Question type mappings for smart extraction
@@ -217,21 +379,73 @@ class KnowledgeBase:
             "about": ["about", "tell me about", "what is", "info", "information", "എന്താണ്", "കുറിച്ച്"],
             "facilities": ["facilities", "amenities", "what facilities", "സൗകര്യങ്ങൾ"],
         }
+        # Overlapping keywords ("hostel", "hostel fee") must all count, so one
+        # automaton pass rather than a regex alternation
+        self._question_types = list(self.question_keywords)
+        self._keyword_automaton = build_keyword_automaton(self.question_keywords)
+        self._question_types_cached = functools.lru_cache(maxsize=512)(self._find_question_types)
     
     def load_faqs(self):
         try:
             if os.path.exists(self.file_path):
-                with open(self.file_path, "r", encoding="utf-8") as f:
-                    self.faqs = json.load(f)
+                self.faqs = load_json_file(self.file_path)
             elif os.path.exists(f"data/{self.file_path}"):
-                with open(f"data/{self.file_path}", "r", encoding="utf-8") as f:
-                    self.faqs = json.load(f)
+                self.faqs = load_json_file(f"data/{self.file_path}")
             else:
                 # Create sample FAQ data if not exists
                 self.faqs = self._create_sample_data()
         except Exception as e:
             st.error(f"Error loading knowledge base: {e}")
             self.faqs = self._create_sample_data()
+        self._build_index()
+    
+    def _build_index(self):
+        """
+        Normalize patterns and tags once instead of on every query, into flat
+        parallel arrays: distinct strings plus the index of their entry in self.faqs
+        """
+        # pattern -> index of the first entry that uses it
+        first_use = {}
+        # tag -> index of the last entry that uses it
+        tag_owner = {}
+        for idx, entry in enumerate(self.faqs):
+            for p in entry.get("question_patterns", []):
+                first_use.setdefault(self._normalize(p), idx)
+            for tag in entry.get("tags", []):
+                tag_owner[self._normalize(tag)] = idx
+        # Each distinct tag checked once, in order of first appearance
+        self._tags = list(tag_owner)
+        self._tag_owner = list(tag_owner.values())
+        
+        # An empty pattern is contained in every query
+        self._empty_pattern_idx = first_use.pop("", len(self.faqs))
+        # In entry order, so the first pattern found belongs to the earliest entry
+        self._patterns = list(first_use)
+        self._pattern_owner = list(first_use.values())
+        self._entry_index_cached.cache_clear()
+        self._automaton = None
+        if ahocorasick is not None and first_use:
+            self._automaton = ahocorasick.Automaton()
+            for p_norm, idx in first_use.items():
+                self._automaton.add_word(p_norm, idx)
+            self._automaton.make_automaton()
+        # (length, entry index, pattern) sorted by length, for the query-in-pattern check
+        self._by_len = sorted((len(p), idx, p) for p, idx in first_use.items())
+        self._pattern_lengths = [n for n, _, _ in self._by_len]
+    
+    def _first_pattern_hit(self, q_norm: str) -> int:
+        """Index of the first entry with a pattern inside q_norm, else len(self.faqs)"""
+        if self._automaton is None:
+            for p_norm, idx in zip(self._patterns, self._pattern_owner):
+                if idx >= self._empty_pattern_idx:
+                    break
+                if p_norm in q_norm:
+                    return idx
+            return self._empty_pattern_idx
+        best = self._empty_pattern_idx
+        for _, idx in self._automaton.iter(q_norm):
+            best = min(best, idx)
+        return best
     
     def _create_sample_data(self) -> List[Dict]:
         """Create sample FAQ data for demonstration"""
@@ -349,56 +563,58 @@ class KnowledgeBase:
         ]
     
     def _normalize(self, text: str) -> str:
-        return text.lower().strip()
+        return normalize_text(text)
     
     def get_question_type(self, query: str) -> List[str]:
         """Identify what type of information the user is asking for"""
-        query_lower = query.lower()
-        detected_types = []
-        
-        for q_type, keywords in self.question_keywords.items():
-            for keyword in keywords:
-                if keyword in query_lower:
-                    detected_types.append(q_type)
-                    break
+        return list(self._question_types_cached(query.lower()))
+    
+    def _find_question_types(self, query_lower: str) -> Tuple[str, ...]:
+        if self._keyword_automaton is not None:
+            found = {i for _, idxs in self._keyword_automaton.iter(query_lower) for i in idxs}
+            detected_types = [self._question_types[i] for i in sorted(found)]
+        else:
+            detected_types = [
+                q_type for q_type, keywords in self.question_keywords.items()
+                if any(keyword in query_lower for keyword in keywords)
+            ]
         
-        return detected_types if detected_types else ["general"]
+        return tuple(detected_types) if detected_types else ("general",)
     
     def get_relevant_info(self, query: str) -> Optional[Dict[str, Any]]:
         """Find the most relevant FAQ entry for the query"""
         if not self.faqs:
             return None
         
-        q_norm = self._normalize(query)
-        
-        # Direct pattern matching
-        for entry in self.faqs:
-            for pattern in entry.get("question_patterns", []):
-                p_norm = self._normalize(pattern)
-                if p_norm in q_norm or q_norm in p_norm:
-                    return entry
-        
-        # Tag-based matching
-        all_tags = []
-        tag_to_entry = {}
-        for entry in self.faqs:
-            for tag in entry.get("tags", []):
-                t_norm = self._normalize(tag)
-                all_tags.append(t_norm)
-                tag_to_entry[t_norm] = entry
+        idx = self._entry_index_cached(self._normalize(query))
+        return self.faqs[idx] if idx is not None else None
+    
+    def _find_entry_index(self, q_norm: str) -> Optional[int]:
+        """Index in self.faqs of the best entry for a normalized query, or None"""
+        # Direct pattern matching: patterns inside the query come from one
+        # automaton pass; the query can only be inside patterns at least as long
+        best = self._first_pattern_hit(q_norm)
+        start = bisect.bisect_left(self._pattern_lengths, len(q_norm))
+        for _, idx, p_norm in self._by_len[start:]:
+            if idx < best and q_norm in p_norm:
+                best = idx
+        if best < len(self.faqs):
+            return best
         
         # Check for tag matches in query
-        for tag in all_tags:
+        for i, tag in enumerate(self._tags):
             if tag in q_norm:
-                return tag_to_entry[tag]
+                return self._tag_owner[i]
         
-        # Fuzzy matching
+        # Fuzzy matching (Jaro-Winkler favours the shared prefixes typical of typos in short tags)
         words = q_norm.split()
         for word in words:
             if len(word) > 3:
-                close_matches = difflib.get_close_matches(word, all_tags, n=1, cutoff=0.6)
-                if close_matches:
-                    return tag_to_entry[close_matches[0]]
+                match = process.extractOne(
+                    word, self._tags, scorer=JaroWinkler.normalized_similarity, score_cutoff=0.85
+                )
+                if match:
+                    return self._tag_owner[match[2]]
         
         return None
     
@@ -437,17 +653,20 @@ class KnowledgeBase:
             "about": list(facts.keys())[:3] if facts else [],  # First 3 facts for general
         }
         
+        # Fact keys lower-cased once, not once per candidate key
+        lowered_facts = [(key, key.lower(), value) for key, value in facts.items()]
+        
         # Find matching fact
         for q_type in question_types:
             if q_type in type_to_fact_keys:
                 for fact_key in type_to_fact_keys[q_type]:
-                    for key, value in facts.items():
-                        if fact_key in key.lower() or key.lower() in fact_key:
+                    for key, key_lower, value in lowered_facts:
+                        if fact_key in key_lower or key_lower in fact_key:
                             return str(value), key
         
         # If no specific match, check for keywords directly in fact keys
-        for key, value in facts.items():
-            key_lower = key.lower().replace("_", " ")
+        for key, key_lower, value in lowered_facts:
+            key_lower = key_lower.replace("_", " ")
             for word in query_lower.split():
                 if len(word) > 3 and word in key_lower:
                     return str(value), key
@@ -458,37 +677,83 @@ class KnowledgeBase:
 # -------------------------------
 # LANGUAGE HANDLER
 # -------------------------------
-class LanguageHandler:
-    def __init__(self):
-        self.malayalam_unicode_range = ("\u0d00", "\u0d7f")
+MALAYALAM_RE = re.compile("[\u0d00-\u0d7f]")
+
+
+@functools.lru_cache(maxsize=1024)
+def detect_non_malayalam_mode(text: str) -> str:
+    """'en' or 'manglish' for text with no Malayalam script"""
+    if text.isascii() and not USE_LANGDETECT:
+        return "manglish" if has_manglish_hint(text) else "en"
+    # langdetect is unreliable on a few characters, so short text is taken as
+    # English unless it is a known Manglish word ("anu")
+    if len(text) <= 3 and not has_manglish_hint(text):
+        return "en"
+    
+    try:
+        lang_code = get_langdetect()(text)
+        if lang_code == "en":
+            return "en"
+    except Exception:
+        pass
     
+    return "manglish"
+
+
+# ml2en leaves stray control characters in some words ("Kamp\x01oottar")
+CONTROL_CHARS_RE = re.compile(r"[\x00-\x1f\x7f]")
+
+
+@functools.lru_cache(maxsize=1024)
+def transliterate_malayalam(text: str) -> str:
+    """Manglish form of Malayalam text; the input is returned if that fails"""
+    try:
+        return CONTROL_CHARS_RE.sub("", get_ml2en()(text))
+    except Exception as e:
+        print(f"Malayalam to Manglish conversion failed: {e}")
+        return text
+
+
+class LanguageHandler:
     def detect_language_mode(self, text: str) -> str:
         text = text.strip()
         if not text:
             return "en"
         
-        if any(self.malayalam_unicode_range[0] <= ch <= self.malayalam_unicode_range[1] for ch in text):
+        if MALAYALAM_RE.search(text):
             return "ml_script"
         
-        try:
-            lang_code = detect(text)
-            if lang_code == "en":
-                return "en"
-        except Exception:
-            pass
-        
-        return "manglish"
+        return detect_non_malayalam_mode(text)
     
     def malayalam_to_manglish(self, malayalam_text: str) -> str:
-        try:
-            return ml2en(malayalam_text)
-        except Exception:
-            return malayalam_text
+        return transliterate_malayalam(malayalam_text)
 
 
 # -------------------------------
 # HUMAN-LIKE RESPONSE GENERATOR
 # -------------------------------
+# Keywords that pick a template category, checked in this order
+QUESTION_CATEGORIES = {
+    "phone": ["phone", "call", "number", "contact", "ഫോൺ", "നമ്പർ"],
+    "email": ["email", "mail", "ഇമെയിൽ"],
+    "address": ["address", "where", "location", "എവിടെ", "സ്ഥലം"],
+    "timing": ["time", "timing", "hour", "when", "open", "സമയം"],
+    "fee": ["fee", "cost", "price", "pay", "ഫീസ്"],
+    "courses": ["course", "branch", "program", "study", "കോഴ്സ്"],
+    "placement": ["placement", "job", "company", "salary", "package", "പ്ലേസ്മെന്റ്"],
+    "hostel": ["hostel", "stay", "room", "accommodation", "ഹോസ്റ്റൽ"],
+    "admission": ["admission", "join", "apply", "അഡ്മിഷൻ"],
+    "library": ["library", "book", "ലൈബ്രറി"],
+    "principal": ["principal", "head", "പ്രിൻസിപ്പൽ"],
+}
+
+# Openers for replies that list several facts
+MULTI_FACT_INTROS = {
+    "ml": ("ഇതാ വിവരങ്ങൾ:", "ഇതാണ് details:"),
+    "en": ("Here's what I found:", "Here are the details:"),
+}
+
+
 class HumanResponseGenerator:
     """Generate natural, human-like responses based on JSON data"""
     
@@ -604,77 +869,118 @@ class HumanResponseGenerator:
             "",
             "",
         ]
+        
+        self._category_names = list(QUESTION_CATEGORIES)
+        self._category_automaton = build_keyword_automaton(QUESTION_CATEGORIES)
+        # Templates per category index; the extra last slot is "general"
+        self._general_idx = len(self._category_names)
+        self._templates_by_idx = {
+            lang: [
+                tuple(templates.get(name, templates["general"]))
+                for name in self._category_names + ["general"]
+            ]
+            for lang, templates in (("en", self.templates_en), ("ml", self.templates_ml))
+        }
+        self._additions = {
+            "en": tuple(self.friendly_additions_en),
+            "ml": tuple(self.friendly_additions_ml),
+        }
+        
+        # Own generator instead of the module-level one shared by every thread
+        self._rng = random.Random()
+        # Every other reply gets a friendly ending
+        self._addition_coin = itertools.cycle((True, False))
     
     def get_question_category(self, query: str, fact_key: str) -> str:
         """Determine the category of question for template selection"""
+        idx = self._category_index(query, fact_key)
+        return self._category_names[idx] if idx < self._general_idx else "general"
+    
+    def _category_index(self, query: str, fact_key: str) -> int:
+        """Index into self._category_names, or self._general_idx if nothing matches"""
         query_lower = query.lower()
         fact_key_lower = fact_key.lower()
         
-        categories = {
-            "phone": ["phone", "call", "number", "contact", "ഫോൺ", "നമ്പർ"],
-            "email": ["email", "mail", "ഇമെയിൽ"],
-            "address": ["address", "where", "location", "എവിടെ", "സ്ഥലം"],
-            "timing": ["time", "timing", "hour", "when", "open", "സമയം"],
-            "fee": ["fee", "cost", "price", "pay", "ഫീസ്"],
-            "courses": ["course", "branch", "program", "study", "കോഴ്സ്"],
-            "placement": ["placement", "job", "company", "salary", "package", "പ്ലേസ്മെന്റ്"],
-            "hostel": ["hostel", "stay", "room", "accommodation", "ഹോസ്റ്റൽ"],
-            "admission": ["admission", "join", "apply", "അഡ്മിഷൻ"],
-            "library": ["library", "book", "ലൈബ്രറി"],
-            "principal": ["principal", "head", "പ്രിൻസിപ്പൽ"],
-        }
+        if self._category_automaton is not None:
+            # First category, in declaration order, with a keyword in either string
+            return min(
+                (min(idxs) for text in (query_lower, fact_key_lower)
+                 for _, idxs in self._category_automaton.iter(text)),
+                default=self._general_idx,
+            )
         
-        for category, keywords in categories.items():
+        for idx, keywords in enumerate(QUESTION_CATEGORIES.values()):
             for keyword in keywords:
                 if keyword in query_lower or keyword in fact_key_lower:
-                    return category
+                    return idx
         
-        return "general"
+        return self._general_idx
     
     def generate_response(self, query: str, value: str, fact_key: str, lang_mode: str) -> str:
         """Generate a human-like response"""
-        category = self.get_question_category(query, fact_key)
+        lang = "ml" if lang_mode in ["ml_script", "manglish"] else "en"
+        templates = self._templates_by_idx[lang][self._category_index(query, fact_key)]
+        additions = self._additions[lang]
         
-        if lang_mode in ["ml_script", "manglish"]:
-            templates = self.templates_ml.get(category, self.templates_ml["general"])
-            additions = self.friendly_additions_ml
-        else:
-            templates = self.templates_en.get(category, self.templates_en["general"])
-            additions = self.friendly_additions_en
+        # One draw picks both the template and the friendly ending
+        pick = self._rng.randrange(len(templates) * len(additions))
+        template = templates[pick // len(additions)]
+        # The only placeholder is {value}; no need for the format mini-language
+        response = template.replace("{value}", value)
         
-        # Select random template
-        template = random.choice(templates)
-        response = template.format(value=value)
-        
-        # Add friendly ending (50% chance)
-        if random.random() > 0.5:
-            response += random.choice(additions)
+        # Add friendly ending (every other reply)
+        if next(self._addition_coin):
+            response += additions[pick % len(additions)]
         
         return response.strip()
     
+    def response_variants(self, query: str, value: str, fact_key: str, lang_mode: str) -> List[str]:
+        """Every reply generate_response can give without a friendly ending"""
+        lang = "ml" if lang_mode in ["ml_script", "manglish"] else "en"
+        templates = self._templates_by_idx[lang][self._category_index(query, fact_key)]
+        return [template.replace("{value}", value).strip() for template in templates]
+    
     def generate_multi_fact_response(self, query: str, facts: Dict[str, Any], lang_mode: str) -> str:
         """Generate response when multiple facts are relevant"""
-        if lang_mode in ["ml_script", "manglish"]:
-            intro = random.choice(["ഇതാ വിവരങ്ങൾ:", "ഇതാണ് details:"])
-        else:
-            intro = random.choice(["Here's what I found:", "Here are the details:"])
-        
+        lang = "ml" if lang_mode in ["ml_script", "manglish"] else "en"
+        intro = self._rng.choice(MULTI_FACT_INTROS[lang])
+        return intro + " " + self._format_facts(facts)
+    
+    def multi_fact_variants(self, query: str, facts: Dict[str, Any], lang_mode: str) -> List[str]:
+        """Every reply generate_multi_fact_response can give"""
+        lang = "ml" if lang_mode in ["ml_script", "manglish"] else "en"
+        body = self._format_facts(facts)
+        return [intro + " " + body for intro in MULTI_FACT_INTROS[lang]]
+    
+    def _format_facts(self, facts: Dict[str, Any]) -> str:
         # Format facts naturally
         fact_strings = []
         for key, value in list(facts.items())[:3]:  # Limit to 3 facts
             clean_key = key.replace("_", " ").title()
             fact_strings.append(f"{clean_key}: {value}")
         
-        return intro + " " + ". ".join(fact_strings) + "."
+        return ". ".join(fact_strings) + "."
 
 
 # -------------------------------
 # VOICE-OPTIMIZED AI PROCESSOR
 # -------------------------------
+NOT_FOUND_RESPONSES = {
+    "ml": [
+        "ക്ഷമിക്കണം, ആ വിവരം എന്റെ കയ്യിൽ ഇല്ല. മറ്റെന്തെങ്കിലും ചോദിക്കൂ!",
+        "അത് എനിക്ക് അറിയില്ല. വേറെ എന്തെങ്കിലും ചോദിക്കാമോ?",
+    ],
+    "en": [
+        "Sorry, I don't have that specific information. Try asking something else!",
+        "I couldn't find that. Can I help with something else about the college?",
+    ],
+}
+
+
 class AIProcessor:
     def __init__(self, model: str = "sonar"):
         self.model = model
-        self.client = pplx_client
+        self.client = get_pplx_client()
         self.response_generator = HumanResponseGenerator()
     
     def generate_voice_response(self, user_query: str, kb_entry: Dict[str, Any], lang_mode: str, specific_answer: Tuple[str, str] = None) -> str:
@@ -694,6 +1000,19 @@ class AIProcessor:
         # Fallback to AI generation
         return self._generate_ai_response(user_query, kb_entry, lang_mode)
     
+    def voice_response_variants(self, user_query: str, kb_entry: Dict[str, Any], lang_mode: str, specific_answer: Tuple[str, str] = None) -> List[str]:
+        """
+        Replies generate_voice_response is likely to give, for voicing ahead of time.
+        Empty when the reply would come from the LLM.
+        """
+        value, fact_key = specific_answer if specific_answer else (None, "")
+        facts = kb_entry.get("answer_facts", {})
+        if value:
+            return self.response_generator.response_variants(user_query, value, fact_key, lang_mode)
+        if facts:
+            return self.response_generator.multi_fact_variants(user_query, facts, lang_mode)
+        return []
+    
     def _generate_ai_response(self, user_query: str, kb_entry: Dict[str, Any], lang_mode: str) -> str:
         """Use AI to generate response when template doesn't fit"""
         facts = kb_entry.get("answer_facts", {})
@@ -749,16 +1068,8 @@ Give a SHORT, DIRECT answer to ONLY what was asked."""
     
     def generate_not_found_response(self, lang_mode: str) -> str:
         if lang_mode in ["ml_script", "manglish"]:
-            responses = [
-                "ക്ഷമിക്കണം, ആ വിവരം എന്റെ കയ്യിൽ ഇല്ല. മറ്റെന്തെങ്കിലും ചോദിക്കൂ!",
-                "അത് എനിക്ക് അറിയില്ല. വേറെ എന്തെങ്കിലും ചോദിക്കാമോ?",
-            ]
-        else:
-            responses = [
-                "Sorry, I don't have that specific information. Try asking something else!",
-                "I couldn't find that. Can I help with something else about the college?",
-            ]
-        return random.choice(responses)
+            return random.choice(NOT_FOUND_RESPONSES["ml"])
+        return random.choice(NOT_FOUND_RESPONSES["en"])
 
 
 # -------------------------------
@@ -766,17 +1077,30 @@ Give a SHORT, DIRECT answer to ONLY what was asked."""
 # -------------------------------
 class AudioProcessor:
     def __init__(self):
-        self.client = sarvam_client
+        self.client = get_sarvam_client()
         self.language_codes = {
             "en": "en-IN",
             "ml": "ml-IN",
         }
-        self.audio_cache = {}
+        # Recently used clips in memory, everything else on disk
+        self.audio_cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.cache_dir = TTS_CACHE_DIR
+        # cache key -> Future for clips being synthesized right now, so the
+        # same clip requested twice at once costs one Sarvam call
+        self._in_flight = {}
+        # Picked from the first response's shape, then reused
+        self._audio_extractor = None
+        self.audio_ext = "ogg" if TTS_USE_OPUS else "wav"
     
     def get_pace_value(self, speech_rate: str) -> float:
         return {"Slow": 0.85, "Normal": 1.0, "Fast": 1.15}.get(speech_rate, 1.0)
     
-    def text_to_speech(
+    def text_to_speech(self, text: str, *args, **kwargs) -> Optional[bytes]:
+        cache_key = self.text_to_speech_key(text, *args, **kwargs)
+        return self.get_bytes(cache_key) if cache_key else None
+    
+    def text_to_speech_key(
         self, 
         text: str, 
         lang_code: str = "ml",
@@ -785,38 +1109,179 @@ class AudioProcessor:
         pace: float = 1.0,
         loudness: float = 1.5,
         sample_rate: int = 22050
-    ) -> Optional[bytes]:
+    ) -> Optional[str]:
+        """
+        Synthesize into the audio cache and return the clip's cache key.
+        Usually runs on a worker thread, where st.* calls are dropped, so
+        failures are logged and raised for the script thread to report.
+        """
+        if not text or not text.strip():
+            return None
+        
+        text, target_language, cache_key = self._clip_key(
+            text, lang_code, speaker, pitch, pace, loudness, sample_rate
+        )
+        
+        if self.get_bytes(cache_key) is not None:
+            return cache_key
+        
+        with self.cache_lock:
+            pending = self._in_flight.get(cache_key)
+            is_owner = pending is None
+            if is_owner:
+                pending = self._in_flight[cache_key] = Future()
+        if not is_owner:
+            return pending.result()
+        
         try:
-            if not text or not text.strip():
-                return None
-            
-            text = self._prepare_text_for_tts(text)
-            target_language = self.language_codes.get(lang_code, "en-IN")
-            cache_key = f"{hash(text)}_{target_language}_{speaker}_{pace}"
-            
+            voice = (target_language, speaker, pitch, pace, loudness, sample_rate)
+            synthesized = self._synthesize_into_cache(cache_key, text, voice)
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            with self.cache_lock:
+                del self._in_flight[cache_key]
+            pending.set_exception(e)
+            raise
+        with self.cache_lock:
+            del self._in_flight[cache_key]
+        pending.set_result(cache_key if synthesized else None)
+        return cache_key if synthesized else None
+    
+    def cached_audio_key(
+        self, 
+        text: str, 
+        lang_code: str = "ml",
+        speaker: str = "arya",
+        pitch: float = 0,
+        pace: float = 1.0,
+        loudness: float = 1.5,
+        sample_rate: int = 22050
+    ) -> Optional[str]:
+        """Cache key of the clip for this text if it is already synthesized, else None"""
+        if not text or not text.strip():
+            return None
+        _, _, cache_key = self._clip_key(text, lang_code, speaker, pitch, pace, loudness, sample_rate)
+        return cache_key if self.get_bytes(cache_key) is not None else None
+    
+    def _clip_key(self, text, lang_code, speaker, pitch, pace, loudness, sample_rate) -> Tuple[str, str, str]:
+        """(text as sent to Sarvam, Sarvam language code, audio cache key)"""
+        text = self._prepare_text_for_tts(text)
+        target_language = self.language_codes.get(lang_code, "en-IN")
+        key_source = (
+            f"{text}|{target_language}|{speaker}|{pace}|{pitch}|{loudness}|{sample_rate}"
+            f"|bulbul:v2|{self.audio_ext}"
+        )
+        return text, target_language, hashlib.blake2b(key_source.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def _synthesize_into_cache(self, cache_key: str, text: str, voice: tuple) -> bool:
+        """Synthesize text and store the clip under cache_key; False if Sarvam returned no audio"""
+        sentences = [s for s in SENTENCE_END_RE.split(text) if s.strip()]
+        audio_bytes = None
+        if len(sentences) > 1:
+            # Each request only waits for its own sentence, so a long reply
+            # takes about as long as its longest sentence
+            try:
+                clips = list(TTS_SENTENCE_POOL.map(lambda s: self._synthesize(s, *voice), sentences))
+            except Exception as e:
+                print(f"Sentence TTS failed, retrying as one request: {e}")
+                clips = []
+            if clips and all(clips):
+                audio_bytes = self._join_wav_clips(clips)
+        if not audio_bytes:
+            audio_bytes = self._synthesize(text, *voice)
+        if not audio_bytes:
+            return False
+        if TTS_USE_OPUS:
+            audio_bytes = self._to_opus(audio_bytes)
+        self._store_cached_audio(cache_key, audio_bytes)
+        return True
+    
+    def _synthesize(self, text, target_language, speaker, pitch, pace, loudness, sample_rate) -> Optional[bytes]:
+        """One Sarvam request; returns the WAV clip"""
+        response = self.client.text_to_speech.convert(
+            text=text,
+            target_language_code=target_language,
+            speaker=speaker,
+            pitch=pitch,
+            pace=pace,
+            loudness=loudness,
+            speech_sample_rate=sample_rate,
+            enable_preprocessing=True,
+            model="bulbul:v2"
+        )
+        return self._extract_audio(response)
+    
+    @staticmethod
+    def _join_wav_clips(clips: List[bytes]) -> Optional[bytes]:
+        """Concatenate WAV clips with the same format; None if they cannot be joined"""
+        try:
+            out = io.BytesIO()
+            with wave.open(out, "wb") as dst:
+                for i, clip in enumerate(clips):
+                    with wave.open(io.BytesIO(clip), "rb") as src:
+                        if i == 0:
+                            dst.setparams(src.getparams())
+                        elif src.getparams()[:3] != dst.getparams()[:3]:
+                            return None
+                        dst.writeframes(src.readframes(src.getnframes()))
+            return out.getvalue()
+        except (wave.Error, EOFError):
+            return None
+    
+    def get_bytes(self, cache_key: str) -> Optional[bytes]:
+        """Audio for a cache key, from memory or disk"""
+        with self.cache_lock:
             if cache_key in self.audio_cache:
+                self.audio_cache.move_to_end(cache_key)
                 return self.audio_cache[cache_key]
-            
-            response = self.client.text_to_speech.convert(
-                text=text,
-                target_language_code=target_language,
-                speaker=speaker,
-                pitch=pitch,
-                pace=pace,
-                loudness=loudness,
-                speech_sample_rate=sample_rate,
-                enable_preprocessing=True,
-                model="bulbul:v2"
-            )
-            
-            audio_bytes = self._extract_audio(response)
-            if audio_bytes:
-                self.audio_cache[cache_key] = audio_bytes
+        cache_path = os.path.join(self.cache_dir, f"{cache_key}.{self.audio_ext}")
+        if os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                audio_bytes = f.read()
+            self._remember_audio(cache_key, audio_bytes)
             return audio_bytes
-            
+        return None
+    
+    def _store_cached_audio(self, cache_key: str, audio_bytes: bytes):
+        self._remember_audio(cache_key, audio_bytes)
+        # Temp file + rename so a concurrent reader never sees a partial clip
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio_bytes)
+            os.replace(tmp_path, os.path.join(self.cache_dir, f"{cache_key}.{self.audio_ext}"))
+        except OSError as e:
+            print(f"TTS cache write failed: {e}")
+    
+    def _remember_audio(self, cache_key: str, audio_bytes: bytes):
+        with self.cache_lock:
+            self.audio_cache[cache_key] = audio_bytes
+            self.audio_cache.move_to_end(cache_key)
+            if len(self.audio_cache) > TTS_MEMORY_CACHE_SIZE:
+                self.audio_cache.popitem(last=False)
+    
+    def _to_opus(self, wav_bytes: bytes) -> bytes:
+        """Transcode a WAV clip to Opus/OGG; returns the WAV unchanged if that fails"""
+        try:
+            import av
+
+            out = io.BytesIO()
+            with av.open(io.BytesIO(wav_bytes)) as src, av.open(out, mode="w", format="ogg") as dst:
+                stream = dst.add_stream("libopus", rate=48000)
+                stream.bit_rate = TTS_OPUS_BIT_RATE
+                # Opus has no 22.05 kHz mode
+                resampler = av.AudioResampler(format="s16", layout="mono", rate=48000)
+                for frame in src.decode(audio=0):
+                    for resampled in resampler.resample(frame):
+                        dst.mux(stream.encode(resampled))
+                for resampled in resampler.resample(None):
+                    dst.mux(stream.encode(resampled))
+                dst.mux(stream.encode(None))
+            return out.getvalue()
         except Exception as e:
-            st.error(f"TTS Error: {e}")
-            return None
+            print(f"Opus encoding failed, keeping WAV: {e}")
+            return wav_bytes
     
     def _prepare_text_for_tts(self, text: str) -> str:
         replacements = {"@": " at ", "&": " and ", "%": " percent ", "+": " plus ", "₹": " rupees "}
@@ -826,41 +1291,81 @@ class AudioProcessor:
     
     def _extract_audio(self, response) -> Optional[bytes]:
         try:
-            if hasattr(response, 'audios') and response.audios:
-                audio_data = response.audios[0]
-                return base64.b64decode(audio_data) if isinstance(audio_data, str) else audio_data
-            elif hasattr(response, 'audio'):
-                return base64.b64decode(response.audio) if isinstance(response.audio, str) else response.audio
-            elif isinstance(response, (str, bytes)):
-                return base64.b64decode(response) if isinstance(response, str) else response
+            if self._audio_extractor is None:
+                self._audio_extractor = self._select_audio_extractor(response)
+                if self._audio_extractor is None:
+                    return None
+            return self._audio_extractor(response)
         except Exception as e:
-            st.error(f"Audio extraction error: {e}")
+            # Response shape changed; probe again next time
+            self._audio_extractor = None
+            # Runs on a TTS worker thread, where st.error would be dropped
+            print(f"Audio extraction error: {e}")
+        return None
+    
+    def _select_audio_extractor(self, response):
+        if hasattr(response, 'audios') and response.audios:
+            return lambda r: self._decode_audio(r.audios[0])
+        elif hasattr(response, 'audio'):
+            return lambda r: self._decode_audio(r.audio)
+        elif isinstance(response, (str, bytes)):
+            return self._decode_audio
         return None
     
-    def create_autoplay_html(self, audio_bytes: bytes) -> str:
-        audio_b64 = base64.b64encode(audio_bytes).decode()
-        return f'''<audio id="voiceResponse" autoplay controls style="width:100%;">
-            <source src="data:audio/wav;base64,{audio_b64}" type="audio/wav">
-        </audio>'''
+    @staticmethod
+    def _decode_audio(audio_data) -> bytes:
+        return base64.b64decode(audio_data) if isinstance(audio_data, str) else audio_data
+
+
+# -------------------------------
+# SHARED RESOURCES
+# -------------------------------
+# These hold no per-user state, so one instance per process serves every session
+@st.cache_resource
+def get_kb() -> KnowledgeBase:
+    return KnowledgeBase("faq_data.json")
+
+
+@st.cache_resource
+def get_language_handler() -> LanguageHandler:
+    return LanguageHandler()
+
+
+@st.cache_resource
+def get_ai_processor() -> AIProcessor:
+    return AIProcessor()
+
+
+@st.cache_resource
+def get_audio_processor() -> AudioProcessor:
+    return AudioProcessor()
+
+
+@st.cache_resource
+def get_conversation_handler() -> ConversationHandler:
+    return ConversationHandler()
 
 
 # -------------------------------
 # SESSION STATE
 # -------------------------------
+DEFAULT_PREFERENCES = {
+    "voice_enabled": True,
+    "auto_play": True,
+    "tts_language": "ml",
+    "speaker": "arya",
+    "speech_rate": "Normal",
+    "pitch": 0,
+    "loudness": 1.5
+}
+
+
 def init_session():
     defaults = {
         "messages": [],
-        "preferences": {
-            "voice_enabled": True,
-            "auto_play": True,
-            "tts_language": "ml",
-            "speaker": "arya",
-            "speech_rate": "Normal",
-            "pitch": 0,
-            "loudness": 1.5
-        },
+        "preferences": dict(DEFAULT_PREFERENCES),
         "kb": None, "lh": None, "ai": None, "ap": None, "ch": None,
-        "last_audio": None, "autoplay_pending": False, "welcomed": False,
+        "last_audio_key": None, "pending_tts_future": None, "autoplay_pending": False, "welcomed": False,
         "listening": False, "processing": False, "speaking": False,
         "is_mobile": False
     }
@@ -870,15 +1375,17 @@ def init_session():
             st.session_state[key] = value
     
     if st.session_state.kb is None:
-        st.session_state.kb = KnowledgeBase("faq_data.json")
+        st.session_state.kb = get_kb()
     if st.session_state.lh is None:
-        st.session_state.lh = LanguageHandler()
+        st.session_state.lh = get_language_handler()
     if st.session_state.ai is None:
-        st.session_state.ai = AIProcessor()
+        st.session_state.ai = get_ai_processor()
+        # New session: connect in the background before the first question arrives
+        threading.Thread(target=warm_pplx_connection, args=(get_pplx_http_client(),), daemon=True).start()
     if st.session_state.ap is None:
-        st.session_state.ap = AudioProcessor()
+        st.session_state.ap = get_audio_processor()
     if st.session_state.ch is None:
-        st.session_state.ch = ConversationHandler()
+        st.session_state.ch = get_conversation_handler()
     
     # Detect mobile device
     user_agent = st.query_params.get("user_agent", "")
@@ -1474,13 +1981,17 @@ def create_mobile_navigation():
                 clear_chat()
                 st.rerun()
 
+LANG_DISPLAY_NAMES = {"ml": "മലയാളം", "en": "English"}
+
+
 def create_status_bar():
     """Create responsive status bar"""
+    prefs = st.session_state.preferences
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        status_text = "🟢 On" if st.session_state.preferences['voice_enabled'] else "🔴 Off"
-        status_class = "online" if st.session_state.preferences['voice_enabled'] else "offline"
+        status_text = "🟢 On" if prefs['voice_enabled'] else "🔴 Off"
+        status_class = "online" if prefs['voice_enabled'] else "offline"
         if st.session_state.listening:
             status_text = "🎤 Listening"
             status_class = "listening"
@@ -1494,11 +2005,11 @@ def create_status_bar():
         st.markdown(f'<div class="status-indicator {status_class}">{status_text}</div>', unsafe_allow_html=True)
     
     with col2:
-        lang_text = "മലയാളം" if st.session_state.preferences['tts_language'] == 'ml' else 'English'
+        lang_text = LANG_DISPLAY_NAMES.get(prefs['tts_language'], 'English')
         st.markdown(f'<div class="status-indicator">🌐 {lang_text}</div>', unsafe_allow_html=True)
     
     with col3:
-        speaker_name = st.session_state.preferences['speaker'].title()
+        speaker_name = prefs['speaker'].title()
         st.markdown(f'<div class="status-indicator">👤 {speaker_name}</div>', unsafe_allow_html=True)
 
 def create_sound_wave_animation():
@@ -1516,40 +2027,138 @@ def create_sound_wave_animation():
         </div>
         """, unsafe_allow_html=True)
 
+QUICK_QUESTIONS = [
+    ("📞", "Phone?", "What is the phone number?"),
+    ("📍", "Location?", "Where is the college located?"),
+    ("📧", "Email?", "What is the email address?"),
+    ("💰", "Fees?", "What are the fees?"),
+    ("📚", "Courses?", "What courses are available?"),
+    ("🏠", "Hostel?", "Tell me about hostel"),
+    ("💼", "Placement?", "What about placements?"),
+    ("🕐", "Timing?", "What is the college timing?"),
+]
+
+# Set once the quick-answer warm-up has started in this process
+QUICK_WARM_STARTED = threading.Event()
+QUICK_WARM_LOCK = threading.Lock()
+
+
 def create_quick_questions_grid():
     """Create responsive grid for quick questions"""
-    questions = [
-        ("📞", "Phone?", "What is the phone number?"),
-        ("📍", "Location?", "Where is the college located?"),
-        ("📧", "Email?", "What is the email address?"),
-        ("💰", "Fees?", "What are the fees?"),
-        ("📚", "Courses?", "What courses are available?"),
-        ("🏠", "Hostel?", "Tell me about hostel"),
-        ("💼", "Placement?", "What about placements?"),
-        ("🕐", "Timing?", "What is the college timing?"),
-    ]
-    
-    # Use different layouts based on screen size
-    if st.session_state.is_mobile:
-        cols = st.columns(2)
-        for idx, (icon, label, question) in enumerate(questions):
-            with cols[idx % 2]:
-                if st.button(f"{icon} {label}", key=f"quick_{label}", use_container_width=True):
-                    process_query(question)
-                    st.rerun()
-    else:
-        # Create a responsive grid
-        cols = st.columns(4)
-        for idx, (icon, label, question) in enumerate(questions):
-            with cols[idx % 4]:
-                if st.button(f"{icon} {label}", key=f"quick_{label}", use_container_width=True):
-                    process_query(question)
-                    st.rerun()
+    questions = QUICK_QUESTIONS
+    
+    # Voice the fixed questions' replies ahead of time, for the default voice
+    # only; any other voice settings are voiced on demand
+    if not QUICK_WARM_STARTED.is_set():
+        settings = get_voice_settings()
+        if settings[0] and settings == get_voice_settings(DEFAULT_PREFERENCES):
+            start_quick_answer_warmup(
+                settings, st.session_state.lh, st.session_state.kb, st.session_state.ai, st.session_state.ap
+            )
+    
+    # Use different layouts based on screen size.
+    # Clicks run process_query as a callback, before the rerun the click
+    # triggers anyway, so no extra st.rerun() is needed.
+    n_cols = 2 if st.session_state.is_mobile else 4
+    cols = st.columns(n_cols)
+    for idx, (icon, label, question) in enumerate(questions):
+        with cols[idx % n_cols]:
+            st.button(f"{icon} {label}", key=f"quick_{label}", use_container_width=True,
+                      on_click=process_query, args=(question,))
 
 
 # -------------------------------
 # CORE FUNCTIONS
 # -------------------------------
+def get_voice_settings(prefs: Optional[Dict[str, Any]] = None) -> Tuple[bool, str, str, float, float]:
+    """(voice_enabled, language, speaker, pace, loudness) from the user's preferences, or from prefs"""
+    if prefs is None:
+        prefs = st.session_state.preferences
+    return (
+        prefs["voice_enabled"], prefs["tts_language"], prefs["speaker"],
+        st.session_state.ap.get_pace_value(prefs["speech_rate"]), prefs["loudness"]
+    )
+
+
+def build_response(query: str, ch, lh, kb, ai) -> str:
+    """Answer text for a query; takes the handlers explicitly so it can run off the script thread"""
+    # Check if it's conversational
+    is_conv, conv_response, conv_type = ch.is_conversation_query(query)
+    
+    if is_conv:
+        return conv_response
+    
+    lang_mode, processed_query, kb_entry, specific_answer = resolve_kb_query(query, lh, kb)
+    if kb_entry:
+        return ai.generate_voice_response(processed_query, kb_entry, lang_mode, specific_answer)
+    return ai.generate_not_found_response(lang_mode)
+
+
+def resolve_kb_query(query: str, lh, kb):
+    """(lang_mode, processed_query, kb_entry, specific_answer) for a query; no randomness"""
+    lang_mode = lh.detect_language_mode(query)
+    processed_query = query
+    
+    # Search knowledge base. Its Malayalam patterns and tags are in script, so
+    # the Manglish transliteration is only tried when the query as typed misses.
+    kb_entry = kb.get_relevant_info(query)
+    if kb_entry is None and lang_mode == "ml_script":
+        processed_query = lh.malayalam_to_manglish(query)
+        kb_entry = kb.get_relevant_info(processed_query)
+    
+    # Extract specific answer for the question
+    specific_answer = kb.extract_specific_answer(processed_query, kb_entry) if kb_entry else None
+    return lang_mode, processed_query, kb_entry, specific_answer
+
+
+def synthesize_with_settings(ap, text: str, settings) -> Optional[str]:
+    voice_enabled, lang_code, speaker, pace, loudness = settings
+    if not voice_enabled:
+        return None
+    return ap.text_to_speech_key(text=text, lang_code=lang_code, speaker=speaker, pace=pace, loudness=loudness)
+
+
+def cached_audio_with_settings(ap, text: str, settings) -> Optional[str]:
+    voice_enabled, lang_code, speaker, pace, loudness = settings
+    if not voice_enabled:
+        return None
+    return ap.cached_audio_key(text=text, lang_code=lang_code, speaker=speaker, pace=pace, loudness=loudness)
+
+
+def start_quick_answer_warmup(settings, lh, kb, ai, ap):
+    """Run warm_quick_answers in the background, once per process"""
+    with QUICK_WARM_LOCK:
+        if QUICK_WARM_STARTED.is_set():
+            return
+        QUICK_WARM_STARTED.set()
+    threading.Thread(target=warm_quick_answers, args=(settings, lh, kb, ai, ap), daemon=True).start()
+
+
+def warm_quick_answers(settings, lh, kb, ai, ap):
+    """
+    Background job: voice the replies the quick questions can get, for these settings.
+    Only the clips are made ahead; each click still picks its reply text fresh.
+    """
+    texts = []
+    for _, _, question in QUICK_QUESTIONS:
+        try:
+            lang_mode, processed_query, kb_entry, specific_answer = resolve_kb_query(question, lh, kb)
+            if kb_entry:
+                texts += ai.voice_response_variants(processed_query, kb_entry, lang_mode, specific_answer)
+        except Exception as e:
+            print(f"Quick answer warm-up failed for {question!r}: {e}")
+    
+    # The canned "not found" replies are voiced ahead too, so a KB miss plays from the cache
+    for responses in NOT_FOUND_RESPONSES.values():
+        texts += responses
+    
+    for text in dict.fromkeys(texts):
+        try:
+            synthesize_with_settings(ap, text, settings)
+        except Exception as e:
+            print(f"Reply warm-up failed for {text!r}: {e}")
+
+
 def process_query(query: str, is_voice: bool = False):
     """Process user query and generate voice response"""
     
@@ -1557,42 +2166,21 @@ def process_query(query: str, is_voice: bool = False):
     st.session_state.processing = True
     st.session_state.listening = False
     
-    # Check if it's conversational
-    is_conv, conv_response, conv_type = st.session_state.ch.is_conversation_query(query)
+    settings = get_voice_settings()
+    response = build_response(
+        query, st.session_state.ch, st.session_state.lh, st.session_state.kb, st.session_state.ai
+    )
+    # Replies voiced ahead of time (quick answers, not-found replies) play right away
+    audio_key = cached_audio_with_settings(st.session_state.ap, response, settings)
     
-    if is_conv:
-        response = conv_response
-    else:
-        lang_mode = st.session_state.lh.detect_language_mode(query)
-        processed_query = st.session_state.lh.malayalam_to_manglish(query) if lang_mode == "ml_script" else query
-        
-        # Search knowledge base
-        kb_entry = st.session_state.kb.get_relevant_info(processed_query)
-        
-        if kb_entry:
-            # Extract specific answer for the question
-            specific_answer = st.session_state.kb.extract_specific_answer(processed_query, kb_entry)
-            response = st.session_state.ai.generate_voice_response(
-                processed_query, kb_entry, lang_mode, specific_answer
-            )
-        else:
-            response = st.session_state.ai.generate_not_found_response(lang_mode)
-    
-    # Generate audio
-    audio_bytes = None
-    if st.session_state.preferences["voice_enabled"]:
-        prefs = st.session_state.preferences
-        audio_bytes = st.session_state.ap.text_to_speech(
-            text=response,
-            lang_code=prefs["tts_language"],
-            speaker=prefs["speaker"],
-            pace=st.session_state.ap.get_pace_value(prefs["speech_rate"]),
-            loudness=prefs["loudness"]
-        )
+    # Otherwise generate audio in the background; it is picked up when the chat renders
+    audio_future = None
+    if settings[0] and audio_key is None:
+        audio_future = TTS_POOL.submit(synthesize_with_settings, st.session_state.ap, response, settings)
     
     # Update states
     st.session_state.processing = False
-    st.session_state.speaking = audio_bytes is not None
+    st.session_state.speaking = audio_key is not None or audio_future is not None
     
     # Save messages
     timestamp = datetime.now().strftime("%H:%M")
@@ -1606,23 +2194,135 @@ def process_query(query: str, is_voice: bool = False):
         "role": "assistant", 
         "content": response, 
         "time": timestamp, 
-        "audio": audio_bytes
+        "audio_key": audio_key,
+        "audio_future": audio_future
     })
+    st.session_state.messages = st.session_state.messages[-MAX_MESSAGES:]
     
-    if audio_bytes and st.session_state.preferences["auto_play"]:
-        st.session_state.last_audio = audio_bytes
+    if (audio_key or audio_future) and st.session_state.preferences["auto_play"]:
+        st.session_state.last_audio_key = audio_key
+        st.session_state.pending_tts_future = audio_future
         st.session_state.autoplay_pending = True
 
 
+def tts_future_result(future: Future) -> Optional[str]:
+    """
+    Audio cache key from a background TTS job. Worker threads cannot reach
+    the page, so their failures are shown here, once, on the script thread.
+    """
+    try:
+        return future.result()
+    except Exception as e:
+        if not getattr(future, "error_reported", False):
+            future.error_reported = True
+            st.error(f"TTS Error: {e}")
+        return None
+
+
+def get_message_audio(msg: Dict[str, Any], ap: "AudioProcessor") -> Optional[bytes]:
+    """Audio for a chat message once its background TTS has finished"""
+    future = msg.get("audio_future")
+    if future is not None:
+        if not future.done():
+            return None
+        msg.pop("audio_future")
+        msg["audio_key"] = tts_future_result(future)
+    audio_key = msg.get("audio_key")
+    return ap.get_bytes(audio_key) if audio_key else None
+
+
+def get_autoplay_audio() -> Optional[bytes]:
+    """Audio queued for autoplay once its background TTS has finished"""
+    ss = st.session_state
+    future = ss.pending_tts_future
+    if future is not None:
+        ss.pending_tts_future = None
+        ss.last_audio_key = tts_future_result(future)
+    audio_key = ss.last_audio_key
+    return ss.ap.get_bytes(audio_key) if audio_key else None
+
+
+def audio_mime_type(audio: bytes) -> str:
+    return "audio/ogg" if audio[:4] == b"OggS" else "audio/wav"
+
+
+def render_message_audio(msg: Dict[str, Any], ap: "AudioProcessor"):
+    audio = get_message_audio(msg, ap)
+    if audio:
+        st.audio(audio, format=audio_mime_type(audio))
+    elif msg.get("audio_future") is not None:
+        st.caption("🔊 Preparing voice reply...")
+
+
+def render_chat_history():
+    """Render the chat, batching message HTML into as few st.markdown calls as possible"""
+    # Session state lookups go through a proxy; resolve them once, not per message
+    ap = st.session_state.ap
+    parts = []
+    for msg in st.session_state.messages:
+        if msg["role"] == "user":
+            icon = "🎤" if msg.get("is_voice") else "💬"
+            parts.append(
+                f'<div class="user-msg">'
+                f'<strong>You {icon}</strong> '
+                f'<span class="message-time">({msg["time"]})</span><br>'
+                f'{escape(msg["content"])}'
+                f'</div>'
+            )
+        else:
+            parts.append(
+                f'<div class="bot-msg">'
+                f'<strong>🤖 സർവജ്ഞ</strong> '
+                f'<span class="message-time">({msg["time"]})</span><br>'
+                f'{escape(msg["content"])}'
+                f'</div>'
+            )
+            if msg.get("audio_key") or msg.get("audio_future") is not None:
+                # The player is its own element, so flush the HTML above it first
+                st.markdown("".join(parts), unsafe_allow_html=True)
+                parts = []
+                render_message_audio(msg, ap)
+    if parts:
+        st.markdown("".join(parts), unsafe_allow_html=True)
+
+
+def render_autoplay():
+    """Autoplay the latest reply (served from Streamlit's media endpoint, not inlined as base64)"""
+    ss = st.session_state
+    future = ss.pending_tts_future
+    if not ss.autoplay_pending or (future is not None and not future.done()):
+        return
+    ss.autoplay_pending = False
+    audio = get_autoplay_audio()
+    if audio:
+        ss.speaking = True
+        st.audio(audio, format=audio_mime_type(audio), autoplay=True)
+
+
+def has_pending_tts() -> bool:
+    ss = st.session_state
+    futures = [msg.get("audio_future") for msg in ss.messages]
+    futures.append(ss.pending_tts_future)
+    return any(future is not None and not future.done() for future in futures)
+
+
+@st.fragment(run_every=0.5)
+def wait_for_tts():
+    """Poll background TTS without blocking the page; rerun once the audio is ready"""
+    if not has_pending_tts():
+        st.rerun()
+
+
 def generate_welcome():
     lang = st.session_state.preferences["tts_language"]
     welcome_text = st.session_state.ch.get_welcome_message(lang)
     timestamp = datetime.now().strftime("%H:%M")
     
-    audio_bytes = None
+    audio_future = None
     if st.session_state.preferences["voice_enabled"]:
         prefs = st.session_state.preferences
-        audio_bytes = st.session_state.ap.text_to_speech(
+        audio_future = TTS_POOL.submit(
+            st.session_state.ap.text_to_speech_key,
             welcome_text, prefs["tts_language"], prefs["speaker"],
             pace=st.session_state.ap.get_pace_value(prefs["speech_rate"])
         )
@@ -1631,12 +2331,14 @@ def generate_welcome():
         "role": "assistant", 
         "content": welcome_text, 
         "time": timestamp, 
-        "audio": audio_bytes, 
+        "audio_key": None, 
+        "audio_future": audio_future,
         "is_welcome": True
     })
     
-    if audio_bytes and st.session_state.preferences["auto_play"]:
-        st.session_state.last_audio = audio_bytes
+    if audio_future and st.session_state.preferences["auto_play"]:
+        st.session_state.last_audio_key = None
+        st.session_state.pending_tts_future = audio_future
         st.session_state.autoplay_pending = True
     
     st.session_state.welcomed = True
@@ -1644,7 +2346,8 @@ def generate_welcome():
 
 def clear_chat():
     st.session_state.messages = []
-    st.session_state.last_audio = None
+    st.session_state.last_audio_key = None
+    st.session_state.pending_tts_future = None
     st.session_state.autoplay_pending = False
     st.session_state.welcomed = False
     st.session_state.listening = False
@@ -1763,6 +2466,7 @@ if st.session_state.is_mobile:
         st.markdown("<h4>Speak your question</h4>", unsafe_allow_html=True)
         
         # Voice input
+        from streamlit_mic_recorder import speech_to_text
         voice_text = speech_to_text(
             language='ml-IN',
             start_prompt="🎙️ Start Recording",
@@ -1782,21 +2486,25 @@ if st.session_state.is_mobile:
     # Text input section
     with st.container():
         st.markdown("### 💬 Text Input")
-        user_input = st.text_input(
-            "Type your question:",
-            placeholder="Ask anything about LBS College...",
-            key="mobile_text_input"
-        )
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("📤 Send", type="primary", use_container_width=True) and user_input.strip():
-                process_query(user_input.strip())
-                st.rerun()
-        with col2:
-            if st.button("👋 Hello", use_container_width=True):
-                process_query("Hello!")
-                st.rerun()
+        # Inside a form, editing the input does not rerun the script; only a submit does
+        with st.form("mobile_text_form", border=False):
+            user_input = st.text_input(
+                "Type your question:",
+                placeholder="Ask anything about LBS College...",
+                key="mobile_text_input"
+            )
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                send = st.form_submit_button("📤 Send", type="primary", use_container_width=True)
+            with col2:
+                hello = st.form_submit_button("👋 Hello", use_container_width=True)
+        if send and user_input.strip():
+            process_query(user_input.strip())
+            st.rerun()
+        elif hello:
+            process_query("Hello!")
+            st.rerun()
     
     # Quick questions
     st.divider()
@@ -1816,37 +2524,10 @@ if st.session_state.is_mobile:
         ''', unsafe_allow_html=True)
     
     # Display messages with mobile-optimized styling
-    for msg in st.session_state.messages:
-        if msg["role"] == "user":
-            icon = "🎤" if msg.get("is_voice") else "💬"
-            st.markdown(
-                f'<div class="user-msg">'
-                f'<strong>You {icon}</strong> '
-                f'<span class="message-time">({msg["time"]})</span><br>'
-                f'{msg["content"]}'
-                f'</div>',
-                unsafe_allow_html=True
-            )
-        else:
-            st.markdown(
-                f'<div class="bot-msg">'
-                f'<strong>🤖 സർവജ്ഞ</strong> '
-                f'<span class="message-time">({msg["time"]})</span><br>'
-                f'{msg["content"]}'
-                f'</div>',
-                unsafe_allow_html=True
-            )
-            if msg.get("audio"):
-                st.audio(msg["audio"], format="audio/wav")
+    render_chat_history()
     
     # Auto-play audio
-    if st.session_state.autoplay_pending and st.session_state.last_audio:
-        st.session_state.autoplay_pending = False
-        st.session_state.speaking = True
-        st.markdown(
-            st.session_state.ap.create_autoplay_html(st.session_state.last_audio),
-            unsafe_allow_html=True
-        )
+    render_autoplay()
 
 else:
     # Desktop layout
@@ -1856,20 +2537,23 @@ else:
         tab1, tab2 = st.tabs(["💬 Type", "🎤 Speak"])
         
         with tab1:
-            user_input = st.text_input(
-                "Chat with me:", 
-                placeholder="Ask anything! e.g., 'What is the phone number?' or 'Sugamano?'",
-                key="desktop_text_input"
-            )
-            col_send, col_greet = st.columns([3, 1])
-            with col_send:
-                if st.button("📤 Send", type="primary", use_container_width=True) and user_input.strip():
-                    process_query(user_input.strip())
-                    st.rerun()
-            with col_greet:
-                if st.button("👋 Hi!", use_container_width=True):
-                    process_query("Hello!")
-                    st.rerun()
+            with st.form("desktop_text_form", border=False):
+                user_input = st.text_input(
+                    "Chat with me:", 
+                    placeholder="Ask anything! e.g., 'What is the phone number?' or 'Sugamano?'",
+                    key="desktop_text_input"
+                )
+                col_send, col_greet = st.columns([3, 1])
+                with col_send:
+                    send = st.form_submit_button("📤 Send", type="primary", use_container_width=True)
+                with col_greet:
+                    greet = st.form_submit_button("👋 Hi!", use_container_width=True)
+            if send and user_input.strip():
+                process_query(user_input.strip())
+                st.rerun()
+            elif greet:
+                process_query("Hello!")
+                st.rerun()
         
         with tab2:
             st.markdown('<div class="voice-box">', unsafe_allow_html=True)
@@ -1879,6 +2563,7 @@ else:
             if st.session_state.listening:
                 create_sound_wave_animation()
             
+            from streamlit_mic_recorder import speech_to_text
             voice_text = speech_to_text(
                 language='ml-IN', 
                 start_prompt="🎙️ Start Recording", 
@@ -1905,43 +2590,15 @@ else:
             </div>
             ''', unsafe_allow_html=True)
         
-        for msg in st.session_state.messages:
-            if msg["role"] == "user":
-                icon = "🎤" if msg.get("is_voice") else "💬"
-                st.markdown(
-                    f'<div class="user-msg">'
-                    f'<strong>You {icon}</strong> '
-                    f'<span class="message-time">({msg["time"]})</span><br>'
-                    f'{msg["content"]}'
-                    f'</div>',
-                    unsafe_allow_html=True
-                )
-            else:
-                st.markdown(
-                    f'<div class="bot-msg">'
-                    f'<strong>🤖 സർവജ്ഞ</strong> '
-                    f'<span class="message-time">({msg["time"]})</span><br>'
-                    f'{msg["content"]}'
-                    f'</div>',
-                    unsafe_allow_html=True
-                )
-                if msg.get("audio"):
-                    st.audio(msg["audio"], format="audio/wav")
-        
-        if st.session_state.autoplay_pending and st.session_state.last_audio:
-            st.session_state.autoplay_pending = False
-            st.session_state.speaking = True
-            st.markdown(
-                st.session_state.ap.create_autoplay_html(st.session_state.last_audio),
-                unsafe_allow_html=True
-            )
+        render_chat_history()
+        
+        render_autoplay()
     
     with side_col:
         st.markdown("### 💬 Quick Chat")
         for label, query in [("👋 Hello!", "Hello!"), ("🙏 നമസ്കാരം", "നമസ്കാരം"), ("😊 Sugamano?", "Sugamano?")]:
-            if st.button(label, key=f"greet_{label}", use_container_width=True):
-                process_query(query)
-                st.rerun()
+            st.button(label, key=f"greet_{label}", use_container_width=True,
+                      on_click=process_query, args=(query,))
         
         st.divider()
         st.markdown("### ⚡ Quick Questions")
@@ -1958,6 +2615,10 @@ st.markdown('''
 </div>
 ''', unsafe_allow_html=True)
 
+# Pick up reply audio as soon as background TTS finishes
+if has_pending_tts():
+    wait_for_tts()
+
 # Clean up states after audio playback
 if st.session_state.speaking and not st.session_state.autoplay_pending:
     # Reset speaking state after a delay
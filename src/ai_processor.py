@@ -3,12 +3,69 @@ AI processing module using Perplexity API
 """
 
 import os
-from openai import OpenAI
+import re
+import json
+import hashlib
+from collections import OrderedDict
 import logging
 from typing import Dict, Any
 
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
 logger = logging.getLogger(__name__)
 
+RESPONSE_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "ai_responses")
+RESPONSE_CACHE_SIZE = 512
+# Answers on disk are dropped after a day even if nothing they depend on changed
+RESPONSE_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Language-specific instructions
+LANG_INSTRUCTIONS = {
+    "en": (
+        "Answer in simple, clear English.\n"
+        "Use a friendly, helpful tone suitable for college students."
+    ),
+    "manglish": (
+        "Answer in Manglish (Malayalam written in English letters).\n"
+        "Use a warm, natural, conversational tone.\n"
+        "Include common Malayalam expressions where appropriate."
+    ),
+}
+
+SYSTEM_PROMPT_TEMPLATE = """You are സർവജ്ഞ (Sarva-jña), an AI assistant for LBS College of Engineering, Kasaragod.
+
+CRITICAL RULES:
+1. Use ONLY the information provided in KB_FACTS
+2. Do NOT invent new facts or details
+3. Do NOT use internet knowledge
+4. Structure your response naturally, not as a list
+5. {lang_instruction}
+
+If KB_FACTS don't fully answer the question, acknowledge this politely."""
+
+# Built once per language instead of on every call
+SYSTEM_PROMPTS = {
+    mode: SYSTEM_PROMPT_TEMPLATE.format(lang_instruction=instruction)
+    for mode, instruction in LANG_INSTRUCTIONS.items()
+}
+
+# Sentence end: terminal punctuation followed by whitespace (so "4.5" is not split)
+SENTENCE_END_RE = re.compile(r"(?<=[.!?\u0964])\s+")
+
+def split_sentences(buffer: str):
+    """
+    Split complete sentences off the front of buffer
+    
+    Returns:
+        (sentences, remainder) where remainder is the unfinished tail
+    """
+    parts = SENTENCE_END_RE.split(buffer)
+    sentences = [s.strip() for s in parts[:-1] if s.strip()]
+    return sentences, parts[-1]
+
 class AIProcessor:
     """Handles AI interactions using Perplexity API"""
     
@@ -19,10 +76,19 @@ class AIProcessor:
         if not self.api_key:
             raise ValueError("PPLX_API_KEY not found in environment variables")
         
+        # Imported here so loading this module does not pull in the SDK
+        from openai import OpenAI
         self.client = OpenAI(
             api_key=self.api_key,
             base_url="https://api.perplexity.ai",
         )
+        
+        # Answers are cached per exact prompt (question, facts, system prompt
+        # and model), so editing the KB or the prompts never replays old answers
+        self._response_cache = OrderedDict()
+        self._disk_cache = diskcache.Cache(RESPONSE_CACHE_DIR) if diskcache is not None else None
+        # entry id -> KB facts formatted for the prompt
+        self._kb_text_cache = {}
     
     def rewrite_from_kb(self, user_query: str, kb_entry: Dict[str, Any], lang_mode: str) -> str:
         """
@@ -36,38 +102,98 @@ class AIProcessor:
         Returns:
             Natural language response
         """
-        facts = kb_entry.get("answer_facts", {})
-        tags = kb_entry.get("tags", [])
+        messages = self._build_messages(user_query, kb_entry, lang_mode)
+        cache_key = self._cache_key(messages)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            return cached
         
-        # Format facts as text
-        kb_text = "\n".join(f"{key}: {value}" for key, value in facts.items())
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500
+            )
+            
+            answer = response.choices[0].message.content.strip()
+            self._store_cached_response(cache_key, answer)
+            return answer
+            
+        except Exception as e:
+            logger.error(f"AI Processing Error: {e}")
+            return self._fallback_response(kb_entry, lang_mode)
+    
+    def rewrite_from_kb_stream(self, user_query: str, kb_entry: Dict[str, Any], lang_mode: str):
+        """
+        Same answer as rewrite_from_kb, yielded one sentence at a time as the
+        API streams it, so TTS can start on the first sentence early
         
-        # Language-specific instructions
-        if lang_mode == "en":
-            lang_instruction = """
-            Answer in simple, clear English. 
-            Use a friendly, helpful tone suitable for college students.
-            """
-        else:
-            lang_instruction = """
-            Answer in Manglish (Malayalam written in English letters).
-            Use a warm, natural, conversational tone.
-            Include common Malayalam expressions where appropriate.
-            """
+        Yields:
+            Complete sentences of the response
+        """
+        messages = self._build_messages(user_query, kb_entry, lang_mode)
+        cache_key = self._cache_key(messages)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            sentences, rest = split_sentences(cached)
+            yield from sentences
+            if rest.strip():
+                yield rest.strip()
+            return
         
-        # System prompt
-        system_prompt = f"""
-        You are സർവജ്ഞ (Sarva-jña), an AI assistant for LBS College of Engineering, Kasaragod.
+        sentences = []
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500,
+                stream=True
+            )
+            buffer = ""
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                buffer += chunk.choices[0].delta.content or ""
+                complete, buffer = split_sentences(buffer)
+                for sentence in complete:
+                    sentences.append(sentence)
+                    yield sentence
+            if buffer.strip():
+                sentences.append(buffer.strip())
+                yield buffer.strip()
+        except Exception as e:
+            logger.error(f"AI Processing Error: {e}")
+            # Only fall back if nothing has been spoken yet
+            if not sentences:
+                yield self._fallback_response(kb_entry, lang_mode)
+            return
         
-        CRITICAL RULES:
-        1. Use ONLY the information provided in KB_FACTS
-        2. Do NOT invent new facts or details
-        3. Do NOT use internet knowledge
-        4. Structure your response naturally, not as a list
-        5. {lang_instruction}
+        if sentences:
+            self._store_cached_response(cache_key, " ".join(sentences))
+    
+    def _cache_key(self, messages) -> str:
+        """Response cache key: a hash of the model and the exact prompt"""
+        prompt = json.dumps([self.model, messages], ensure_ascii=False)
+        return "pplx:" + hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    
+    def _build_messages(self, user_query: str, kb_entry: Dict[str, Any], lang_mode: str):
+        """Chat messages grounding the answer in the entry's facts"""
+        # Spacing does not change the question, so it should not change the cache key
+        user_query = " ".join(user_query.split())
+        facts = kb_entry.get("answer_facts", {})
+        tags = kb_entry.get("tags", [])
         
-        If KB_FACTS don't fully answer the question, acknowledge this politely.
-        """
+        # Formatted once per entry; the facts do not change while the app runs
+        entry_id = kb_entry.get("id")
+        kb_text = self._kb_text_cache.get(entry_id) if entry_id else None
+        if kb_text is None:
+            kb_text = "\n".join(f"{key}: {value}" for key, value in facts.items())
+            if entry_id:
+                self._kb_text_cache[entry_id] = kb_text
+        
+        system_prompt = SYSTEM_PROMPTS["en" if lang_mode == "en" else "manglish"]
         
         # User message
         user_message = f"""
@@ -81,27 +207,45 @@ class AIProcessor:
         Please provide a helpful answer based only on the KB facts above.
         """
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            logger.error(f"AI Processing Error: {e}")
-            
-            # Fallback response
-            if lang_mode == "en":
-                return f"Here's what I know: {' '.join(facts.values())}"
-            else:
-                return f"ഇതാ എനിക്കറിയാവുന്നത്: {' '.join(facts.values())}"
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+    
+    def _fallback_response(self, kb_entry: Dict[str, Any], lang_mode: str) -> str:
+        """Answer built straight from the facts when the API call fails"""
+        facts = kb_entry.get("answer_facts", {})
+        if lang_mode == "en":
+            return f"Here's what I know: {' '.join(facts.values())}"
+        else:
+            return f"ഇതാ എനിക്കറിയാവുന്നത്: {' '.join(facts.values())}"
+    
+    def _get_cached_response(self, cache_key: str):
+        """Look up a cached answer in memory, then on disk"""
+        if cache_key in self._response_cache:
+            self._response_cache.move_to_end(cache_key)
+            return self._response_cache[cache_key]
+        if self._disk_cache is not None:
+            answer = self._disk_cache.get(cache_key)
+            if answer is not None:
+                self._remember_response(cache_key, answer)
+                return answer
+        return None
+    
+    def _store_cached_response(self, cache_key: str, answer: str):
+        """Store an answer in memory and, if available, on disk"""
+        self._remember_response(cache_key, answer)
+        if self._disk_cache is not None:
+            try:
+                self._disk_cache.set(cache_key, answer, expire=RESPONSE_CACHE_TTL_SECONDS)
+            except Exception as e:
+                logger.warning(f"Response cache write failed: {e}")
+    
+    def _remember_response(self, cache_key: str, answer: str):
+        self._response_cache[cache_key] = answer
+        self._response_cache.move_to_end(cache_key)
+        if len(self._response_cache) > RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
     
     def generate_general_response(self, query: str, lang_mode: str) -> str:
         """
@@ -2,13 +2,18 @@
 Audio processing module for voice assistant
 """
 
-import io
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
 from typing import Optional
-from gtts import gTTS
 import logging
 
 logger = logging.getLogger(__name__)
 
+TTS_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "gtts")
+TTS_MEMORY_CACHE_SIZE = 128
+
 class AudioProcessor:
     """Handles text-to-speech and audio processing"""
     
@@ -19,6 +24,10 @@ class AudioProcessor:
             "hi": "Hindi",
             "ta": "Tamil"
         }
+        # Clips are keyed by a stable digest of (language, text), kept in
+        # memory for hot items and on disk across restarts
+        self.cache_dir = TTS_CACHE_DIR
+        self._audio_cache = OrderedDict()
     
     def text_to_speech(self, text: str, lang_code: str = "ml") -> Optional[bytes]:
         """
@@ -35,16 +44,56 @@ class AudioProcessor:
             if lang_code not in self.supported_languages:
                 lang_code = "en"  # Default to English
             
+            cache_key = hashlib.blake2b(
+                f"{lang_code}|{text}".encode("utf-8"), digest_size=16
+            ).hexdigest()
+            cached = self._get_cached_audio(cache_key)
+            if cached is not None:
+                return cached
+            
+            # Only needed on a cache miss
+            from gtts import gTTS
             tts = gTTS(text=text, lang=lang_code, slow=False)
-            audio_buffer = io.BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
-            return audio_buffer.read()
+            # MP3 chunks as gTTS receives them, joined without an intermediate buffer
+            audio = b"".join(tts.stream())
+            self._store_cached_audio(cache_key, audio)
+            return audio
             
         except Exception as e:
             logger.error(f"TTS Error: {e}")
             return None
     
+    def _get_cached_audio(self, cache_key: str) -> Optional[bytes]:
+        """Look up a clip in memory, then on disk"""
+        if cache_key in self._audio_cache:
+            self._audio_cache.move_to_end(cache_key)
+            return self._audio_cache[cache_key]
+        try:
+            with open(os.path.join(self.cache_dir, f"{cache_key}.mp3"), "rb") as f:
+                audio = f.read()
+        except OSError:
+            return None
+        self._remember_audio(cache_key, audio)
+        return audio
+    
+    def _store_cached_audio(self, cache_key: str, audio: bytes):
+        """Store a clip in memory and on disk (temp file + rename, so readers never see a partial file)"""
+        self._remember_audio(cache_key, audio)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, os.path.join(self.cache_dir, f"{cache_key}.mp3"))
+        except OSError as e:
+            logger.warning(f"TTS cache write failed: {e}")
+    
+    def _remember_audio(self, cache_key: str, audio: bytes):
+        self._audio_cache[cache_key] = audio
+        self._audio_cache.move_to_end(cache_key)
+        if len(self._audio_cache) > TTS_MEMORY_CACHE_SIZE:
+            self._audio_cache.popitem(last=False)
+    
     def validate_audio_length(self, text: str, max_length: int = 1000) -> bool:
         """
         Validate if text is suitable for TTS
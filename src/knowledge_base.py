@@ -1,13 +1,41 @@
 import os
 import json
-import difflib
+import mmap
+import bisect
 from typing import Optional, Dict, Any
+from rapidfuzz import fuzz, process
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+def _load_json_file(path: str):
+    """Parse a JSON file, using orjson over a memory map when available"""
+    if orjson is None:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return orjson.loads(view)
 
 
 class KnowledgeBase:
     def __init__(self, file_name: str = "faq_data.json"):
         self.file_path = file_name
         self.faqs = []
+        self._norm_patterns = []
+        self._automaton = None
+        self._empty_pattern_idx = 0
+        self._by_len = []
+        self._pattern_lengths = []
+        self._tags = []
+        self._tag_to_entry = {}
         self.load_faqs()
     
     def load_faqs(self):
@@ -15,18 +43,57 @@ class KnowledgeBase:
         try:
             # First check in current directory
             if os.path.exists(self.file_path):
-                with open(self.file_path, "r", encoding="utf-8") as f:
-                    self.faqs = json.load(f)
+                self.faqs = _load_json_file(self.file_path)
             # Check in data directory
             elif os.path.exists(f"data/{self.file_path}"):
-                with open(f"data/{self.file_path}", "r", encoding="utf-8") as f:
-                    self.faqs = json.load(f)
+                self.faqs = _load_json_file(f"data/{self.file_path}")
             else:
                 print(f"Warning: Knowledge base file '{self.file_path}' not found.")
                 self.faqs = []
         except Exception as e:
             print(f"Error loading knowledge base: {e}")
             self.faqs = []
+        self._build_index()
+    
+    def _build_index(self):
+        """Normalize patterns and tags once instead of on every query"""
+        self._norm_patterns = []
+        self._tag_to_entry = {}
+        # pattern -> index of the first entry that uses it
+        first_use = {}
+        for idx, entry in enumerate(self.faqs):
+            patterns = [self._normalize(p) for p in entry.get("question_patterns", [])]
+            self._norm_patterns.append((entry, patterns))
+            for p_norm in patterns:
+                first_use.setdefault(p_norm, idx)
+            for tag in entry.get("tags", []):
+                self._tag_to_entry[self._normalize(tag)] = entry
+        # Each distinct tag scored once, in order of first appearance
+        self._tags = list(self._tag_to_entry)
+        
+        # An empty pattern is contained in every query
+        self._empty_pattern_idx = first_use.pop("", len(self.faqs))
+        self._automaton = None
+        if ahocorasick is not None and first_use:
+            self._automaton = ahocorasick.Automaton()
+            for p_norm, idx in first_use.items():
+                self._automaton.add_word(p_norm, idx)
+            self._automaton.make_automaton()
+        # (length, entry index, pattern) sorted by length, for the query-in-pattern check
+        self._by_len = sorted((len(p), idx, p) for p, idx in first_use.items())
+        self._pattern_lengths = [n for n, _, _ in self._by_len]
+    
+    def _first_pattern_hit(self, q_norm: str) -> int:
+        """Index of the first entry with a pattern inside q_norm, else len(self.faqs)"""
+        if self._automaton is None:
+            for idx, (_, patterns) in enumerate(self._norm_patterns):
+                if any(p_norm in q_norm for p_norm in patterns):
+                    return idx
+            return len(self.faqs)
+        best = self._empty_pattern_idx
+        for _, idx in self._automaton.iter(q_norm):
+            best = min(best, idx)
+        return best
     
     def _normalize(self, text: str) -> str:
         """Normalize text for comparison"""
@@ -39,24 +106,20 @@ class KnowledgeBase:
         
         q_norm = self._normalize(query)
         
-        # 1) Exact / substring on question_patterns
-        for entry in self.faqs:
-            for pattern in entry.get("question_patterns", []):
-                p_norm = self._normalize(pattern)
-                if p_norm in q_norm or q_norm in p_norm:
-                    return entry
-        
-        # 2) Fuzzy matching on tags
-        all_tags = []
-        tag_to_entry = {}
-        for entry in self.faqs:
-            for tag in entry.get("tags", []):
-                t_norm = self._normalize(tag)
-                all_tags.append(t_norm)
-                tag_to_entry[t_norm] = entry
+        # 1) Exact / substring on question_patterns: patterns inside the query
+        # come from one automaton pass; the query can only be inside patterns
+        # at least as long as itself
+        best = self._first_pattern_hit(q_norm)
+        start = bisect.bisect_left(self._pattern_lengths, len(q_norm))
+        for _, idx, p_norm in self._by_len[start:]:
+            if idx < best and q_norm in p_norm:
+                best = idx
+        if best < len(self.faqs):
+            return self.faqs[best]
         
-        close_matches = difflib.get_close_matches(q_norm, all_tags, n=1, cutoff=0.5)
-        if close_matches:
-            return tag_to_entry[close_matches[0]]
+        # 2) Fuzzy matching on tags (fuzz.ratio follows difflib's ratio, in C++)
+        match = process.extractOne(q_norm, self._tags, scorer=fuzz.ratio, score_cutoff=50)
+        if match:
+            return self._tag_to_entry[match[0]]
         
         return None
\ No newline at end of file
@@ -2,15 +2,68 @@
 Language detection and translation module
 """
 
-from langdetect import detect, DetectorFactory
-from ml2en import ml2en
+import os
+import re
+from functools import lru_cache
 import logging
+from typing import List
 
-# For consistent language detection
-DetectorFactory.seed = 0
+# Any character from the Malayalam Unicode block
+MALAYALAM_RE = re.compile("[\u0d00-\u0d7f]")
+# ml2en leaves stray control characters in some words
+CONTROL_CHARS_RE = re.compile(r"[\x00-\x1f\x7f]")
 
 logger = logging.getLogger(__name__)
 
+# Optional fastText language-ID model (lid.176.ftz); langdetect is used if absent
+FASTTEXT_MODEL_PATH = os.getenv("FASTTEXT_LID_MODEL", "lid.176.ftz")
+
+@lru_cache(maxsize=None)
+def _load_fasttext_model():
+    """Load the fastText model on first use, or return None if it is not available"""
+    if not os.path.exists(FASTTEXT_MODEL_PATH):
+        return None
+    try:
+        import fasttext
+        return fasttext.load_model(FASTTEXT_MODEL_PATH)
+    except Exception as e:
+        logger.warning(f"fastText model could not be loaded, using langdetect: {e}")
+        return None
+
+@lru_cache(maxsize=None)
+def _get_langdetect():
+    """Import langdetect on first use; it loads its language profiles at import"""
+    from langdetect import detect, DetectorFactory
+    # For consistent language detection
+    DetectorFactory.seed = 0
+    return detect
+
+@lru_cache(maxsize=4096)
+def _cached_transliterate(text: str) -> str:
+    """Memoized ml2en transliteration (its output depends only on the input)"""
+    from ml2en import ml2en
+    return CONTROL_CHARS_RE.sub("", ml2en.transliterate(text))
+
+@lru_cache(maxsize=4096)
+def _cached_detect(text: str):
+    """
+    Memoized language detection; returns None if detection fails.
+    Safe to cache because both fastText and seeded langdetect are deterministic.
+    """
+    fasttext_model = _load_fasttext_model()
+    if fasttext_model is not None:
+        try:
+            labels, _ = fasttext_model.predict(text.replace("\n", " "), k=1)
+            return labels[0].replace("__label__", "")
+        except Exception as e:
+            # e.g. fasttext 0.9.2 with numpy>=2 loads fine but fails here
+            logger.warning(f"fastText prediction failed, using langdetect: {e}")
+    try:
+        return _get_langdetect()(text)
+    except Exception as e:
+        logger.debug(f"Language detection failed: {e}")
+        return None
+
 class LanguageHandler:
     """Handles language detection and conversion"""
     
@@ -31,17 +84,12 @@ class LanguageHandler:
             return "en"
         
         # Check for Malayalam Unicode characters
-        if any(self.malayalam_unicode_range[0] <= ch <= self.malayalam_unicode_range[1] 
-               for ch in text):
+        if MALAYALAM_RE.search(text):
             return "ml_script"
         
         # Try langdetect for English
-        try:
-            lang_code = detect(text)
-            if lang_code == "en":
-                return "en"
-        except Exception as e:
-            logger.debug(f"Language detection failed: {e}")
+        if _cached_detect(text) == "en":
+            return "en"
         
         # Default to manglish
         return "manglish"
@@ -57,11 +105,26 @@ class LanguageHandler:
             Text in Manglish (English transliteration)
         """
         try:
-            return ml2en(malayalam_text)
+            return _cached_transliterate(malayalam_text)
         except Exception as e:
             logger.error(f"Malayalam to Manglish conversion failed: {e}")
             return malayalam_text  # Return original if conversion fails
     
+    def kb_queries(self, text: str) -> List[str]:
+        """
+        Forms of text to look up in the knowledge base, best first
+        
+        The KB stores its Malayalam patterns and tags in script, so the text as
+        typed always comes first; Malayalam script also gets its Manglish form
+        as a fallback for entries that only have romanized patterns.
+        """
+        queries = [text]
+        if MALAYALAM_RE.search(text):
+            manglish = self.malayalam_to_manglish(text)
+            if manglish != text:
+                queries.append(manglish)
+        return queries
+    
     def get_language_name(self, mode: str) -> str:
         """Get human-readable language name"""
         language_names = {
@@ -0,0 +1,65 @@
+import ast
+import os
+import types
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAQ_PATH = os.path.join(ROOT, "data", "faq_data.json")
+
+# app.py is a Streamlit script, so importing it would render the whole UI.
+# Only the definitions the KB path needs are executed, with its imports.
+APP_NAMES = {
+    "USE_LANGDETECT", "MALAYALAM_RE", "CONTROL_CHARS_RE", "load_json_file",
+    "normalize_text", "build_keyword_automaton", "get_langdetect", "get_ml2en",
+    "detect_non_malayalam_mode", "transliterate_malayalam", "KnowledgeBase",
+    "LanguageHandler", "resolve_kb_query",
+}
+
+
+def load_app_definitions():
+    with open(os.path.join(ROOT, "app.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    nodes = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.Try)):
+            names = [alias.name for alias in getattr(node, "names", [])]
+            if "streamlit" not in names and getattr(node, "module", None) != "dotenv":
+                nodes.append(node)
+        elif isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in APP_NAMES:
+            nodes.append(node)
+        elif isinstance(node, ast.Assign) and any(
+            getattr(t, "id", None) in APP_NAMES for t in node.targets
+        ):
+            nodes.append(node)
+    namespace = {"st": types.SimpleNamespace(error=print)}
+    exec(compile(ast.Module(nodes, []), "app.py", "exec"), namespace)
+    return namespace
+
+
+# Malayalam questions and the entry ids they should resolve to
+MALAYALAM_CASES = [
+    ("ഫീസ് എത്രയാണ്?", 5),
+    ("കോളേജ് എവിടെയാണ്?", 29),
+    ("ബസ് സൗകര്യം ഉണ്ടോ", 55),
+]
+
+
+class ResolveKbQueryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        app = load_app_definitions()
+        cls.resolve = staticmethod(app["resolve_kb_query"])
+        cls.kb = app["KnowledgeBase"](FAQ_PATH)
+        cls.lh = app["LanguageHandler"]()
+
+    def test_malayalam_questions_match_script_patterns(self):
+        for query, entry_id in MALAYALAM_CASES:
+            with self.subTest(query=query):
+                lang_mode, _, kb_entry, _ = self.resolve(query, self.lh, self.kb)
+                self.assertEqual(lang_mode, "ml_script")
+                self.assertIsNotNone(kb_entry)
+                self.assertEqual(kb_entry.get("id"), entry_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
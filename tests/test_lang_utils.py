@@ -0,0 +1,40 @@
+import unittest
+
+from utils.lang_utils import has_manglish_hint
+
+# (query, expected) for the ASCII word-list check used by app.py
+CASES = [
+    ("Sugamano?", True),
+    ("sukhamano", True),
+    ("namaskaram", True),
+    ("course ethokke", True),
+    ("enthokke courses und", True),
+    ("hostel undo?", True),
+    ("fees ethra aanu", True),
+    ("college evide aanu", True),
+    ("library timing alle", True),
+    ("class eppozhanu", True),
+    ("ee course nallathano", True),
+    ("hostel evideyanu", True),
+    ("canteen undo ille", True),
+    ("What are the fees?", False),
+    ("Library timing", False),
+    ("Where is the college located?", False),
+    ("Tell me about hostel", False),
+    ("Is there a fund for students?", False),
+    ("Is there a piano in the music club?", False),
+    ("Any volcano or soprano events?", False),
+    ("Which programs are available?", False),
+    ("", False),
+]
+
+
+class HasManglishHintTest(unittest.TestCase):
+    def test_cases(self):
+        for query, expected in CASES:
+            with self.subTest(query=query):
+                self.assertEqual(has_manglish_hint(query), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,92 @@
 import os
+import re
+import asyncio
+import hashlib
+import functools
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from utils.worker_pool import submit
+
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Optional shared cache, e.g. redis://localhost:6379/0
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Sentence end: terminal punctuation followed by whitespace (so "4.5" is not split)
+SENTENCE_END_RE = re.compile(r"(?<=[.!?\u0964])\s+")
+
+
+def split_sentences(buffer: str):
+    """
+    Split complete sentences off the front of buffer.
+    Returns (sentences, remainder) where remainder is the unfinished tail.
+    """
+    parts = SENTENCE_END_RE.split(buffer)
+    sentences = [s.strip() for s in parts[:-1] if s.strip()]
+    return sentences, parts[-1]
+
+
+SYSTEM_PROMPT = (
+    "You are an AI assistant for LBS College of Engineering, Kasaragod.\n"
+    "You MUST use only the information given in KB_FACTS when stating facts.\n"
+    "Do not invent new factual details. You can change wording and style.\n"
+    "Do not repeat KB_FACTS as a list; create a short, natural answer.\n"
+)
+
+LANG_INSTRUCTIONS = {
+    "en": "Answer in simple, clear English.",
+    "ml_script": "Answer in Malayalam script.",
+}
+MANGLISH_INSTRUCTION = (
+    "Answer in Manglish (Malayalam written in English letters), "
+    "using friendly, natural tone."
+)
+
+
+def build_prompt(user_query: str, kb_entry: dict, lang_mode: str) -> str:
+    """
+    Build the Gemini prompt for a KB entry. Pure function of its inputs,
+    so the prompt text can be used directly as a cache key.
+    """
+    tags = kb_entry.get("tags", [])
+    # Precomputed by KnowledgeBase at load time; entries from elsewhere are formatted here
+    base_facts_str = kb_entry.get("_facts_str")
+    if base_facts_str is None:
+        base_facts_str = "".join(
+            f"{k}: {v}\n" for k, v in kb_entry.get("answer_facts", {}).items()
+        )
+    lang_instruction = LANG_INSTRUCTIONS.get(lang_mode, MANGLISH_INSTRUCTION)
+
+    return f"""
+{SYSTEM_PROMPT}
+
+User Question:
+{user_query}
+
+KB_TAGS:
+{tags}
+
+KB_FACTS:
+{base_facts_str}
+
+Language requirement:
+{lang_instruction}
+"""
+
+
+def _connect_redis():
+    if not REDIS_URL:
+        return None
+    try:
+        import redis
+
+        return redis.Redis.from_url(REDIS_URL)
+    except Exception as e:
+        print("Redis cache disabled:", e)
+        return None
 
 
 class GeminiAIProcessor:
@@ -14,50 +96,76 @@ class GeminiAIProcessor:
         genai.configure(api_key=GEMINI_API_KEY)
         # Use a fast model; you can change to a different one if needed
         self.model = genai.GenerativeModel("gemini-1.5-flash")
+        self._redis = _connect_redis()
+        # Same prompt -> same answer; keep the hot set in memory
+        self._generate_cached = functools.lru_cache(maxsize=2048)(self._generate)
 
     def generate_rewritten_answer(self, user_query: str, kb_entry: dict, lang_mode: str) -> str:
         """
         lang_mode: 'en', 'ml_script', 'manglish'
         """
-        facts = kb_entry.get("answer_facts", {})
-        tags = kb_entry.get("tags", [])
-
-        base_facts_str = ""
-        for k, v in facts.items():
-            base_facts_str += f"{k}: {v}\n"
-
-        if lang_mode == "en":
-            lang_instruction = "Answer in simple, clear English."
-        elif lang_mode == "ml_script":
-            lang_instruction = "Answer in Malayalam script."
-        else:
-            lang_instruction = (
-                "Answer in Manglish (Malayalam written in English letters), "
-                "using friendly, natural tone."
-            )
-
-        system_prompt = (
-            "You are an AI assistant for LBS College of Engineering, Kasaragod.\n"
-            "You MUST use only the information given in KB_FACTS when stating facts.\n"
-            "Do not invent new factual details. You can change wording and style.\n"
-            "Do not repeat KB_FACTS as a list; create a short, natural answer.\n"
-        )
+        query = " ".join(user_query.split())
+        return self._generate_cached(build_prompt(query, kb_entry, lang_mode))
 
-        full_prompt = f"""
-{system_prompt}
+    def generate_async(self, user_query: str, kb_entry: dict, lang_mode: str):
+        """
+        Same as generate_rewritten_answer, but runs on the shared worker pool.
+        Returns a Future resolving to the answer text.
+        """
+        return submit(self.generate_rewritten_answer, user_query, kb_entry, lang_mode)
 
-User Question:
-{user_query}
+    async def generate_rewritten_answer_stream(self, user_query: str, kb_entry: dict, lang_mode: str):
+        """
+        Async generator yielding the answer one sentence at a time as Gemini
+        streams it, so TTS can start on the first sentence early.
+        Streaming calls are not cached.
+        """
+        query = " ".join(user_query.split())
+        response = await self.model.generate_content_async(
+            build_prompt(query, kb_entry, lang_mode), stream=True
+        )
+        buffer = ""
+        async for chunk in response:
+            buffer += chunk.text
+            sentences, buffer = split_sentences(buffer)
+            for sentence in sentences:
+                yield sentence
+        if buffer.strip():
+            yield buffer.strip()
 
-KB_TAGS:
-{tags}
+    async def generate_many(self, items, concurrency: int = 8):
+        """
+        items: iterable of (user_query, kb_entry, lang_mode) tuples.
+        Runs up to `concurrency` requests at a time; answers keep input order.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
 
-KB_FACTS:
-{base_facts_str}
+        async def run(item):
+            user_query, kb_entry, lang_mode = item
+            async with semaphore:
+                # Goes through the same cache as generate_rewritten_answer
+                return await asyncio.to_thread(
+                    self.generate_rewritten_answer, user_query, kb_entry, lang_mode
+                )
 
-Language requirement:
-{lang_instruction}
-"""
+        return await asyncio.gather(*(run(item) for item in items))
+
+    def _generate(self, full_prompt: str) -> str:
+        key = "gemini:" + hashlib.sha256(full_prompt.encode("utf-8")).hexdigest()
+        if self._redis is not None:
+            try:
+                cached = self._redis.get(key)
+                if cached is not None:
+                    return cached.decode("utf-8")
+            except Exception as e:
+                print("Redis get failed:", e)
 
         response = self.model.generate_content(full_prompt)
-        return response.text.strip()
+        text = response.text.strip()
+
+        if self._redis is not None:
+            try:
+                self._redis.setex(key, CACHE_TTL_SECONDS, text)
+            except Exception as e:
+                print("Redis set failed:", e)
+        return text
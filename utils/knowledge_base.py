@@ -1,6 +1,26 @@
+import bisect
+import functools
 import json
 import os
-import difflib
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import hyperscan
+except ImportError:  # SIMD literal matcher; optional, x86 only
+    hyperscan = None
+try:
+    import ahocorasick
+except ImportError:  # fall back to one compiled regex over all patterns
+    ahocorasick = None
+try:
+    import marisa_trie
+except ImportError:  # fall back to a plain dict for exact lookups
+    marisa_trie = None
+from rapidfuzz import fuzz, process
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 
@@ -9,15 +29,125 @@ class KnowledgeBase:
     def __init__(self, file_name: str = "faq_data.json"):
         self.file_path = os.path.join(DATA_DIR, file_name)
         self.faqs = []
+        self._all_tags = []
+        self._tag_to_entry = {}
+        self._tag_lengths = []
+        self._exact = {}
+        self._automaton = None
+        self._hs_db = None
+        self._pattern_re = None
+        self._by_len = []
+        self._pattern_lengths = []
         self.load_faqs()
 
     def load_faqs(self):
         try:
-            with open(self.file_path, "r", encoding="utf-8") as f:
-                self.faqs = json.load(f)
+            if orjson is not None:
+                with open(self.file_path, "rb") as f:
+                    self.faqs = orjson.loads(f.read())
+            else:
+                with open(self.file_path, "r", encoding="utf-8") as f:
+                    self.faqs = json.load(f)
         except Exception as e:
             print("Error loading KB:", e)
             self.faqs = []
+        self._build_index()
+
+    def _build_index(self):
+        """
+        Normalize patterns and tags once at load time so that
+        get_relevant_info only has to normalize the query.
+        """
+        self._tag_to_entry = {}
+        # pattern -> index of the first entry that uses it
+        exact = {}
+        first_use = {}
+        for idx, entry in enumerate(self.faqs):
+            # Facts block used verbatim in LLM prompts
+            entry["_facts_str"] = "".join(
+                f"{k}: {v}\n" for k, v in entry.get("answer_facts", {}).items()
+            )
+            for p in entry.get("question_patterns", []):
+                p_norm = self._normalize(p)
+                exact.setdefault(p_norm, idx)
+                if p_norm:
+                    first_use.setdefault(p_norm, idx)
+            for t in entry.get("tags", []):
+                self._tag_to_entry[self._normalize(t)] = entry
+        # Each distinct tag scored once, in order of first appearance
+        self._all_tags = list(self._tag_to_entry)
+        # Patterns share a lot of prefixes ("admission ...", "fees ..."), which
+        # a compressed trie stores once
+        if marisa_trie is not None and exact:
+            self._exact = marisa_trie.RecordTrie(
+                "<I", ((p_norm, (idx,)) for p_norm, idx in exact.items())
+            )
+        else:
+            self._exact = exact
+        self._build_pattern_matcher(first_use)
+        # (length, entry index, pattern) sorted by length, for the reverse check
+        self._by_len = sorted((len(p), idx, p) for p, idx in first_use.items())
+        self._pattern_lengths = [n for n, _, _ in self._by_len]
+        # distinct tag lengths, longest first, for prefix lookups
+        self._tag_lengths = sorted({len(t) for t in self._tag_to_entry if t}, reverse=True)
+
+    def _build_pattern_matcher(self, first_use):
+        self._automaton = None
+        self._hs_db = None
+        self._pattern_re = None
+        if not first_use:
+            return
+        if hyperscan is not None:
+            # Match ids are entry indices; SINGLEMATCH reports each id once
+            self._hs_db = hyperscan.Database()
+            self._hs_db.compile(
+                expressions=[p_norm.encode("utf-8") for p_norm in first_use],
+                ids=list(first_use.values()),
+                flags=hyperscan.HS_FLAG_SINGLEMATCH,
+                literal=True,
+            )
+            return
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for p_norm, idx in first_use.items():
+                self._automaton.add_word(p_norm, idx)
+            self._automaton.make_automaton()
+            return
+        # One group per entry, in entry order. Inside a lookahead so every
+        # start position is tried and the lowest entry matching there wins.
+        by_entry = {}
+        for p_norm, idx in first_use.items():
+            by_entry.setdefault(idx, []).append(re.escape(p_norm))
+        groups = "|".join(
+            f"(?P<e{idx}>{'|'.join(pats)})" for idx, pats in sorted(by_entry.items())
+        )
+        self._pattern_re = re.compile(f"(?=(?:{groups}))")
+
+    def _first_pattern_hit(self, q_norm: str) -> int:
+        """Index of the first entry with a pattern inside q_norm, else len(self.faqs)."""
+        best = len(self.faqs)
+        if self._hs_db is not None:
+            hits = []
+            self._hs_db.scan(
+                q_norm.encode("utf-8"),
+                match_event_handler=lambda idx, *_: hits.append(idx),
+            )
+            if hits:
+                best = min(hits)
+        elif self._automaton is not None:
+            for _, idx in self._automaton.iter(q_norm):
+                best = min(best, idx)
+        elif self._pattern_re is not None:
+            for m in self._pattern_re.finditer(q_norm):
+                best = min(best, int(m.lastgroup[1:]))
+        return best
+
+    def _exact_hit(self, q_norm: str):
+        """Index of the first entry with a pattern equal to q_norm, else None."""
+        hit = self._exact.get(q_norm)
+        if hit is None or isinstance(self._exact, dict):
+            return hit
+        return hit[0][0]
 
     def _normalize(self, text: str) -> str:
         return text.lower().strip()
@@ -25,8 +155,10 @@ class KnowledgeBase:
     def get_relevant_info(self, query: str):
         """
         Very simple matcher:
-        1) exact / substring match on patterns
-        2) fuzzy match on tags
+        0) exact match on a pattern
+        1) substring match on patterns
+        2) tag that is a prefix of the query
+        3) fuzzy match on tags
         Returns the best KB entry or None.
         """
         if not self.faqs:
@@ -34,26 +166,51 @@ class KnowledgeBase:
 
         q_norm = self._normalize(query)
 
-        # 1. Exact / substring on question_patterns
-        best_entry = None
-        best_score = 0.0
+        # 0. Most queries are exactly one of the patterns
+        idx = self._exact_hit(q_norm)
+        if idx is not None:
+            return self.faqs[idx]
 
-        for entry in self.faqs:
-            for pattern in entry.get("question_patterns", []):
-                p_norm = self._normalize(pattern)
-                if p_norm in q_norm or q_norm in p_norm:
-                    return entry
+        # 1. Substring on question_patterns.
+        # Patterns contained in the query are found in one pass; for the
+        # query-inside-pattern case only patterns at least as long can match.
+        best = self._first_pattern_hit(q_norm)
+        start = bisect.bisect_left(self._pattern_lengths, len(q_norm))
+        for _, idx, p_norm in self._by_len[start:]:
+            if idx < best and q_norm in p_norm:
+                best = idx
+        if best < len(self.faqs):
+            return self.faqs[best]
 
-        # 2. Fuzzy on tags
-        all_tags = []
-        tag_to_entry = {}
-        for entry in self.faqs:
-            for t in entry.get("tags", []):
-                all_tags.append(t)
-                tag_to_entry[t] = entry
+        # 2. Longest tag that the query starts with, as whole words
+        # ("business" must not match the tag "bus")
+        for n in self._tag_lengths:
+            if n > len(q_norm) or q_norm[:n] not in self._tag_to_entry:
+                continue
+            if n == len(q_norm) or not q_norm[n].isalnum():
+                return self._tag_to_entry[q_norm[:n]]
 
-        close = difflib.get_close_matches(q_norm, all_tags, n=1, cutoff=0.5)
-        if close:
-            return tag_to_entry[close[0]]
+        # 3. Fuzzy on tags
+        # fuzz.ratio closely tracks difflib's ratio() but runs in C++
+        match = process.extractOne(q_norm, self._all_tags, scorer=fuzz.ratio, score_cutoff=50)
+        if match:
+            return self._tag_to_entry[match[0]]
 
         return None
+
+
+@functools.lru_cache(maxsize=8)
+def _load_kb(file_name: str, mtime_ns):
+    return KnowledgeBase(file_name)
+
+
+def get_kb(file_name: str = "faq_data.json") -> KnowledgeBase:
+    """
+    Process-wide KnowledgeBase for file_name, so the JSON is parsed and
+    indexed once. Rebuilt automatically when the file's mtime changes.
+    """
+    try:
+        mtime_ns = os.stat(os.path.join(DATA_DIR, file_name)).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    return _load_kb(file_name, mtime_ns)
@@ -1,4 +1,57 @@
-from langdetect import detect
+import functools
+import re
+
+# Any character from the Malayalam Unicode block
+MALAYALAM_RE = re.compile("[\u0d00-\u0d7f]")
+
+# Common Malayalam words as typed in English letters. Queries here are short
+# and often English noun phrases ("Library timing"), so an ASCII query counts
+# as Manglish only if it uses one of these.
+MANGLISH_HINT_WORDS = frozenset({
+    "ano", "aano", "anu", "aanu", "alle", "aalle", "undo", "undu", "illa", "ille",
+    "ethra", "ethre", "evide", "evida", "evideya", "enthu", "entha",
+    "enth", "enthanu", "enthaanu", "entho", "eppo", "eppol", "eppozha", "engane",
+    "enganeya", "enganeyanu", "aara", "aaranu", "araanu", "ethu", "ethanu", "ethaanu",
+    "venam", "venda", "vende", "parayu", "paranju", "parayamo", "njan", "njaan",
+    "ningal", "ningalude", "ente", "enikku", "enik", "sugham", "sukham", "kittum",
+    "kittumo", "pattumo", "pattum", "cheyyan", "cheyyam", "cheyyum", "ennu", "innu",
+    "naale", "ivide", "avide", "onnu", "koode", "kollam", "nalla", "mathi", "poyi",
+    "varum", "varumo", "tharumo", "ariyamo", "ariyilla", "aayi", "kure", "okke",
+    "ethokke", "enthokke", "und", "sugamano", "sukhamano", "sugam", "sukam",
+    "namaskaram", "namaskaaram",
+})
+# Copula and question endings glued onto other words ("eppozhanu",
+# "nallathano"), so suffixed forms need not be listed one by one
+MANGLISH_SUFFIXES = ("anu", "ano", "alle", "ille")
+# English words that happen to end like Manglish
+MANGLISH_SUFFIX_EXCEPTIONS = frozenset({
+    "volcano", "soprano", "oregano", "camille", "bastille", "seville", "nashville", "louisville",
+})
+WORD_RE = re.compile(r"[a-z]+")
+
+
+def _is_manglish_word(word: str) -> bool:
+    if word in MANGLISH_HINT_WORDS:
+        return True
+    if word in MANGLISH_SUFFIX_EXCEPTIONS:
+        return False
+    # At least three letters of stem, so short English words are left alone
+    return any(word.endswith(s) and len(word) - len(s) >= 3 for s in MANGLISH_SUFFIXES)
+
+
+def has_manglish_hint(text: str) -> bool:
+    """True if text uses one of MANGLISH_HINT_WORDS or a word with a Manglish ending"""
+    words = WORD_RE.findall(text.lower().replace("'", ""))
+    return any(_is_manglish_word(word) for word in words)
+
+
+@functools.lru_cache(maxsize=1024)
+def _cached_detect(text: str) -> str:
+    """Memoized langdetect; repeated queries skip the n-gram classifier"""
+    # Imported on first use; langdetect loads its language profiles at import
+    from langdetect import detect
+
+    return detect(text)
 
 
 def detect_lang_mode(text: str) -> str:
@@ -13,13 +66,12 @@ def detect_lang_mode(text: str) -> str:
         return "en"
 
     # Check Malayalam Unicode range
-    for ch in text:
-        if "\u0d00" <= ch <= "\u0d7f":
-            return "ml_script"
+    if MALAYALAM_RE.search(text):
+        return "ml_script"
 
     # Simple heuristic with langdetect
     try:
-        code = detect(text)
+        code = _cached_detect(text)
         if code == "en":
             return "en"
     except Exception:
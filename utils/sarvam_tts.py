@@ -1,11 +1,33 @@
 import os
+import asyncio
+import base64
+import hashlib
+import tempfile
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+from utils.worker_pool import submit
+
+try:
+    import orjson
+
+    _json_dumps, _json_loads = orjson.dumps, orjson.loads
+except ImportError:
+    import json
+
+    def _json_dumps(obj):
+        return json.dumps(obj).encode("utf-8")
+
+    _json_loads = json.loads
+
 load_dotenv()
 
 SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
 
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "sarvam_tts")
+
 
 class SarvamTTS:
     def __init__(self):
@@ -13,24 +35,167 @@ class SarvamTTS:
             raise ValueError("SARVAM_API_KEY not found in environment")
         self.url = "https://api.sarvam.ai/text-to-speech"
         self.api_key = SARVAM_API_KEY
+        self.model = "bulbul:v2"
+        self.cache_dir = CACHE_DIR
+        self.headers = {
+            "Content-Type": "application/json",
+            "x-api-key": self.api_key,
+        }
+        # Keep-alive session so back-to-back calls skip the TCP/TLS handshake
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=None,  # TTS POSTs are safe to repeat
+            raise_on_status=False,  # let raise_for_status() report the final error
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+        self.session.mount("https://", adapter)
+        # Created on first async call and reused so batches share one HTTP/2
+        # connection. Its pooled connections belong to the event loop that made
+        # them, so a call from another loop gets a new client.
+        self._async_client = None
+        self._async_client_loop = None
 
     def synthesize(self, text: str, lang_code: str = "ml-IN", speaker: str = "manisha"):
         """
         Returns raw audio bytes (MP3) from Sarvam TTS.
+        Responses are cached on disk, keyed by text, language, speaker and model.
         """
+        cache_path = self._cache_path(text, lang_code, speaker)
+        if os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                return f.read()
+
         payload = {
             "inputs": [text],
             "target_language_code": lang_code,
             "speaker": speaker,
-            "model": "bulbul:v2",
-        }
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": self.api_key,
+            "model": self.model,
         }
-        resp = requests.post(self.url, json=payload, headers=headers, timeout=30)
+        resp = self.session.post(self.url, data=_json_dumps(payload), timeout=30)
         resp.raise_for_status()
 
-        # API may return JSON with base64 or direct bytes; here assume bytes for simplicity.
-        # If response is JSON with 'audio' field, adapt accordingly from official docs.
-        return resp.content
+        audio = self._decode_audios(resp)[0]
+        self._write_cache(cache_path, audio)
+        return audio
+
+    def synthesize_async(self, text: str, lang_code: str = "ml-IN", speaker: str = "manisha"):
+        """
+        Same as synthesize, but runs on the shared worker pool.
+        Returns a Future resolving to the audio bytes.
+        """
+        return submit(self.synthesize, text, lang_code, speaker)
+
+    async def synthesize_many(self, texts, lang_code: str = "ml-IN", speaker: str = "manisha"):
+        """
+        Synthesize several texts with a single request.
+        Returns a list of audio bytes in the same order as texts.
+        """
+        results = [None] * len(texts)
+        misses = []
+        for i, text in enumerate(texts):
+            cache_path = self._cache_path(text, lang_code, speaker)
+            if os.path.exists(cache_path):
+                with open(cache_path, "rb") as f:
+                    results[i] = f.read()
+            else:
+                misses.append(i)
+
+        if misses:
+            payload = {
+                "inputs": [texts[i] for i in misses],
+                "target_language_code": lang_code,
+                "speaker": speaker,
+                "model": self.model,
+            }
+            resp = await self._get_async_client().post(self.url, content=_json_dumps(payload))
+            resp.raise_for_status()
+
+            for i, audio in zip(misses, self._decode_audios(resp)):
+                self._write_cache(self._cache_path(texts[i], lang_code, speaker), audio)
+                results[i] = audio
+        return results
+
+    async def synthesize_stream(self, sentences, lang_code: str = "ml-IN", speaker: str = "manisha"):
+        """
+        Consume an async iterable of sentences and yield one audio clip per
+        sentence, in order. Each sentence is sent as soon as it arrives, so the
+        first clip can play while later sentences are still being generated.
+        """
+        pending = asyncio.Queue()
+        # Every request started so far, so an early stop can cancel the rest
+        tasks = []
+
+        async def dispatch():
+            try:
+                async for sentence in sentences:
+                    task = asyncio.ensure_future(self.synthesize_many([sentence], lang_code, speaker))
+                    tasks.append(task)
+                    await pending.put(task)
+            finally:
+                await pending.put(None)
+
+        dispatcher = asyncio.ensure_future(dispatch())
+        try:
+            while True:
+                task = await pending.get()
+                if task is None:
+                    break
+                (audio,) = await task
+                yield audio
+            await dispatcher  # re-raise errors from the sentence source
+        finally:
+            # Requests the consumer will never read are not worth paying for
+            dispatcher.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(dispatcher, *tasks, return_exceptions=True)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            if self._async_client_loop is asyncio.get_running_loop():
+                await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
+
+    def _get_async_client(self):
+        """The AsyncClient for the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            # Only batch/stream callers need httpx; keep it off the import path
+            import httpx
+
+            # A client from an earlier loop cannot be closed once that loop has
+            # finished; dropping it releases its sockets
+            self._async_client = httpx.AsyncClient(http2=True, headers=self.headers, timeout=30)
+            self._async_client_loop = loop
+        return self._async_client
+
+    def _decode_audios(self, resp):
+        """
+        Audio clips from a TTS response: JSON with one base64 clip per input
+        under 'audios', or a raw audio body.
+        """
+        if resp.headers.get("content-type", "").startswith("application/json"):
+            return [base64.b64decode(a) for a in _json_loads(resp.content)["audios"]]
+        return [resp.content]
+
+    def _cache_path(self, text: str, lang_code: str, speaker: str) -> str:
+        key = hashlib.sha256(
+            f"{text}|{lang_code}|{speaker}|{self.model}".encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _write_cache(self, cache_path: str, audio: bytes):
+        # Write to a temp file and rename so readers never see a partial file.
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print("Error writing TTS cache:", e)
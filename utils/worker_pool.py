@@ -0,0 +1,24 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 16
+# Submissions beyond this many in flight block the caller instead of piling up
+MAX_PENDING = 64
+
+_POOL = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="lbs-io")
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) on the shared worker pool and return a Future.
+    Used for the network-bound Sarvam and Gemini calls.
+    """
+    _slots.acquire()
+    try:
+        future = _POOL.submit(fn, *args, **kwargs)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future